@@ -1,8 +1,8 @@
 import os
 import re
-from tkinter import Tk, Button, Label, filedialog, StringVar, OptionMenu
-from typing import Dict, List, Tuple
-from collections import defaultdict
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+from collections import Counter, defaultdict
+from wsp_instance import WSPInstance, DEFAULT_CAPACITY, parse_instance
 
 def get_relative_path(relative_path: str) -> str:
     """Get an absolute path relative to the directory of this script."""
@@ -11,7 +11,11 @@ def get_relative_path(relative_path: str) -> str:
 
 
 class WorkflowValidator:
-    def __init__(self):
+    def __init__(self, instance: Optional[WSPInstance] = None, engine: str = "python"):
+        """`engine` selects how complete assignments are checked: "python" or the vectorised "numpy"."""
+        if engine not in ("python", "numpy"):
+            raise ValueError(f"Unknown validation engine: {engine}")
+        self.engine = engine
         self.steps_count = 0
         self.users_count = 0
         self.constraints_count = 0
@@ -20,54 +24,43 @@ class WorkflowValidator:
         self.binding_duties = []  # Pairs of steps
         self.at_most_k = []  # (k, steps)
         self.one_team = []  # (steps, teams)
-        self.default_capacity = 20  # Default capacity for users
+        self.instance = None  # Parsed instance backing the fields below
+        self.default_capacity = DEFAULT_CAPACITY  # Default capacity for users
         self.user_capacities = {}  # Store user capacities if defined
+        self._authorized_steps = {}  # User -> set of allowed steps, for fast membership tests
+        self._one_team_sets = []  # One-team teams as sets, parallel to self.one_team
+        self._numpy_engine = None  # NumpyValidationEngine, built for engine == "numpy" or the first batch
+
+        if instance is not None:
+            self.load_instance(instance)
 
     def parse_problem(self, filepath: str):
         """Parse the problem instance and populate constraints."""
-        with open(filepath, 'r') as file:
-            lines = file.readlines()
-
-        # Parse header
-        self.steps_count = int(lines[0].split(': ')[1])
-        self.users_count = int(lines[1].split(': ')[1])
-        self.constraints_count = int(lines[2].split(': ')[1])
-
-        # Parse constraints
-        for line in lines[3:]:
-            line = line.strip()
-            if not line:
-                continue
-
-            parts = line.split()
-            if parts[0] == "Authorisations":
-                user = int(parts[1][1:])
-                steps = [int(s[1:]) for s in parts[2:]]
-                self.authorizations[user] = steps
-
-            elif parts[0] == "Separation-of-duty":
-                self.separation_duties.append((int(parts[1][1:]), int(parts[2][1:])))
-
-            elif parts[0] == "Binding-of-duty":
-                self.binding_duties.append((int(parts[1][1:]), int(parts[2][1:])))
-
-            elif parts[0] == "At-most-k":
-                k = int(parts[1])
-                steps = [int(s[1:]) for s in parts[2:]]
-                self.at_most_k.append((k, steps))
-
-            elif parts[0] == "One-team":
-                # Parse steps and teams
-                steps = [int(s) for s in re.findall(r's(\d+)', " ".join(parts))]
-                teams_raw = re.findall(r'\(([^)]+)\)', " ".join(parts))
-                teams = [[int(u[1:]) for u in team.split()] for team in teams_raw]
-                self.one_team.append((steps, teams))
-
-            elif parts[0] == "User-Capacity":
-                user = int(parts[1][1:])
-                capacity = int(parts[2])
-                self.user_capacities[user] = capacity
-                print(f"Parsed capacity for User u{user}: {capacity}")
+        self.load_instance(parse_instance(filepath))
+
+    def load_instance(self, instance: WSPInstance):
+        """Populate constraints from an already parsed instance (1-based, as in the files)."""
+        self.instance = instance
+        self.steps_count = instance.steps_count
+        self.users_count = instance.users_count
+        self.constraints_count = instance.constraints_count
+
+        for user, steps in instance.authorisations.items():
+            self.authorizations[user + 1] = [s + 1 for s in steps]
+        self._authorized_steps = {user: set(steps) for user, steps in self.authorizations.items()}
+        self.separation_duties = [(s1 + 1, s2 + 1) for s1, s2 in instance.separation_of_duty]
+        self.binding_duties = [(s1 + 1, s2 + 1) for s1, s2 in instance.binding_of_duty]
+        self.at_most_k = [(k, [s + 1 for s in steps]) for k, steps in instance.at_most_k]
+        self.one_team = [([s + 1 for s in steps], [[u + 1 for u in team] for team in teams])
+                         for steps, teams in instance.one_team]
+        self._one_team_sets = [[set(team) for team in teams] for _, teams in self.one_team]
+        self._numpy_engine = None
+        if self.engine == "numpy":
+            from validator_numpy import NumpyValidationEngine
+            self._numpy_engine = NumpyValidationEngine(instance)
+        for user, capacity in instance.user_capacities.items():
+            self.user_capacities[user + 1] = capacity
+            print(f"Parsed capacity for User u{user + 1}: {capacity}")
 
     def parse_solution(self, filepath: str) -> Tuple[Dict[int, int], bool]:
         """Parse solution file and return step-to-user assignments."""
@@ -92,13 +85,54 @@ class WorkflowValidator:
 
         return assignments, False
 
+    def parse_solutions(self, filepath: str) -> Tuple[List[Dict[int, int]], bool]:
+        """Parse a single or multi-solution file and return one assignment per solution."""
+        solutions = []
+        with open(filepath, 'r') as file:
+            for line in file:
+                line = line.strip()
+                if line.lower() == "unsat":
+                    return [], True  # Return unsat flag
+                if line.startswith("Solution ") or (line == "sat" and not solutions):
+                    solutions.append({})
+                    continue
+                match = re.fullmatch(r's(\d+): u(\d+)', line)
+                if match:
+                    if not solutions:
+                        solutions.append({})
+                    solutions[-1][int(match.group(1))] = int(match.group(2))
+
+        return [solution for solution in solutions if solution], False
+
+    def validate_batch(self, assignments: Union[Sequence[Sequence[int]], Sequence[Dict[int, int]]]):
+        """Validate many complete assignments against this instance in one vectorised pass.
+
+        `assignments` is a (solutions x steps) array of 1-based users, or a list of
+        step -> user dicts as returned by parse_solutions (missing steps count as
+        authorisation violations). Returns a per-solution validity vector and a dict of
+        violation counts per constraint type, each a vector over the solutions.
+        """
+        import numpy as np
+        from validator_numpy import NumpyValidationEngine
+
+        if self._numpy_engine is None:
+            self._numpy_engine = NumpyValidationEngine(self.instance)
+        if len(assignments) and isinstance(assignments[0], dict):
+            assignments = [[solution.get(step, 0) for step in range(1, self.steps_count + 1)]
+                           for solution in assignments]
+        return self._numpy_engine.validate_batch(np.asarray(assignments, dtype=np.intp))
+
     def validate_solution(self, assignments: Dict[int, int]) -> Tuple[bool, List[str]]:
         """Run all validations and return the results."""
+        if self.engine == "numpy" and len(assignments) == self.steps_count \
+                and all(step in assignments for step in range(1, self.steps_count + 1)):
+            return self._numpy_engine.validate([assignments[step] for step in range(1, self.steps_count + 1)])
+
         errors = []
 
         def validate_authorizations():
             for step, user in assignments.items():
-                if user in self.authorizations and step not in self.authorizations[user]:
+                if user in self._authorized_steps and step not in self._authorized_steps[user]:
                     errors.append(f"Authorization violation: User u{user} is not authorized for step s{step}.")
 
         def validate_separation_of_duty():
@@ -118,21 +152,21 @@ class WorkflowValidator:
                     errors.append(f"At-most-{k} violation: More than {k} users assigned to steps {steps}.")
 
         def validate_one_team():
-            for steps, teams in self.one_team:
+            for (steps, teams), team_sets in zip(self.one_team, self._one_team_sets):
                 assigned_users = [assignments[s] for s in steps if s in assignments]
                 # Check if all assigned users form a valid team
-                if not any(all(user in team for user in assigned_users) for team in teams):
+                if not any(all(user in team for user in assigned_users) for team in team_sets):
                     errors.append(f"One-team violated: Steps {steps} assigned users {assigned_users} do not match any valid team {teams}.")
 
         def validate_user_capacity():
             # Ensure no user is assigned more than the default capacity of steps.
-            for user in range(1, self.users_count + 1):
-                assigned_steps = [step for step, assigned_user in assignments.items() if assigned_user == user]
+            assigned_counts = Counter(assignments.values())
+            for user in sorted(assigned_counts):
                 # Check if a specific capacity is defined for this user, otherwise use default
                 capacity = self.user_capacities.get(user, self.default_capacity)
-                if len(assigned_steps) > capacity:
+                if assigned_counts[user] > capacity:
                     errors.append(
-                        f"User-Capacity violation: User u{user} assigned to {len(assigned_steps)} steps, exceeding capacity {capacity}.")
+                        f"User-Capacity violation: User u{user} assigned to {assigned_counts[user]} steps, exceeding capacity {capacity}.")
 
         # Run all validations
         validate_authorizations()
@@ -144,6 +178,16 @@ class WorkflowValidator:
 
         return len(errors) == 0, errors
 
+    def validate(self, assignment: Sequence[int]) -> Tuple[bool, List[str]]:
+        """Validate a complete assignment given as the user of s1, s2, ... in order.
+
+        Meant to be called repeatedly on a validator built once per instance, e.g. from
+        solver callbacks; nothing is re-read from disk.
+        """
+        if self.engine == "numpy":
+            return self._numpy_engine.validate(assignment)
+        return self.validate_solution(dict(enumerate(assignment, start=1)))
+
 
 def autodetect_solution_path(problem_path: str, solver_folder: str) -> str:
     """Determine the solution file path based on the problem file path and chosen solver folder."""
@@ -170,6 +214,8 @@ def autodetect_solution_path(problem_path: str, solver_folder: str) -> str:
 
 
 def main():
+    from tkinter import Tk, Button, Label, filedialog, StringVar, OptionMenu
+
     def select_problem_file():
         """Open file explorer to select problem file."""
         initial_dir = get_relative_path("instances")  # start in the instances directory
@@ -252,7 +298,7 @@ def main():
     # Solver folder selection
     solver_var = StringVar(root)
     solver_var.set("output_ortools")  # default selection
-    solver_options = ["output_ortools", "output_z3", "output_doreen"]
+    solver_options = ["output_ortools", "output_z3", "output_doreen", "output_pattern"]
     solver_dropdown = OptionMenu(root, solver_var, *solver_options)
     solver_dropdown.config(width=20)
     solver_dropdown.pack(pady=5)
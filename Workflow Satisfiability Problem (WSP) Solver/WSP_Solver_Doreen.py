@@ -1,365 +1,288 @@
-import os
-import re
 from time import time as currenttime
 from ortools.sat.python import cp_model
-from halo import Halo
-import tkinter as tk
-from tkinter import filedialog
-from helper import transform_output
-from ValidatorPro import WorkflowValidator 
+from helper import (transform_output, Spinner, log, PhaseTimer, SolverOptions, MULTI_SOLUTION_TIME_LIMIT, solve_diverse,
+                    unsat_result, run_solver_gui)
+from ValidatorPro import WorkflowValidator
+from wsp_instance import load_instance
+from wsp_preprocess import reduce_instance
+from wsp_prechecks import precheck_unsat
 
 
-def parse_file(filename):
-    with open(filename, 'r') as file:
-        lines = file.readlines()
-    
-    # Parse #Steps, #Users, #Constraints
-    steps_count = int(lines[0].split(': ')[1])
-    users_count = int(lines[1].split(': ')[1])
-    constraints_count = int(lines[2].split(': ')[1])
-    
-    constraints = []
-    for line in lines[3:]:
-        constraints.append(line.strip())
-
-    return steps_count, users_count, constraints
-
-
-def build_model(filename):
+def build_model(problem):
     """Build and return the model, assignments structure, and relevant parameters without solving.
-    This function is used by both single and multi solution solvers."""
-    model = cp_model.CpModel()
-    steps_count, users_count, constraints = parse_file(filename)
+    This function is used by both single and multi solution solvers.
 
-    # Create variables: one for each step and each user indicating assignment (1 or 0)
-    user_assignment = [[model.NewBoolVar(f'step_{s + 1}_user_{u + 1}') for u in range(users_count)] for s in range(steps_count)]
-    
-    # Each step is assigned to exactly one user
-    for step in range(steps_count):
-        model.AddExactlyOne(user_assignment[step][user] for user in range(users_count))
-    
-    # Initialize data structures for constraints
-    user_authorisations = {}
-    user_capacities = {}
-    
-    # Parse constraints and apply them to the model
-    for constraint in constraints:
-        parts = constraint.split()
-        
-        if parts[0] == "Authorisations":
-            user = int(parts[1][1:]) - 1  # Adjust to 0-based index
-            allowed_steps = [int(step[1:]) - 1 for step in parts[2:]]
-            
-            if user in user_authorisations:
-                print(f"Warning: User u{user + 1} has multiple authorisations defined; only the first will be used.")
-                continue
-            
-            user_authorisations[user] = allowed_steps
-            for step in range(steps_count):
-                if step not in allowed_steps:
-                    model.Add(user_assignment[step][user] == 0)
-            print(f"Applied Authorisation constraint for user u{user + 1} on steps {[s + 1 for s in allowed_steps]}")
-
-        elif parts[0] == "Separation-of-duty":
-            step1, step2 = int(parts[1][1:]) - 1, int(parts[2][1:]) - 1
-            # If step1 is assigned to a user, step2 cannot be assigned to the same user
-            for user in range(users_count):
-                model.Add(user_assignment[step2][user] == 0).OnlyEnforceIf(user_assignment[step1][user])
-            print(f"Applied Separation-of-duty constraint between steps s{step1 + 1} and s{step2 + 1}")
-
-        elif parts[0] == "Binding-of-duty":
-            step1, step2 = int(parts[1][1:]) - 1, int(parts[2][1:]) - 1
-            # If step1 is assigned to a user, step2 must be assigned to the same user
-            for user in range(users_count):
-                model.Add(user_assignment[step2][user] == 1).OnlyEnforceIf(user_assignment[step1][user])
-            print(f"Applied Binding-of-duty constraint between steps s{step1 + 1} and s{step2 + 1}")
-
-        elif parts[0] == "At-most-k":
-            k = int(parts[1])
-            step_indices = [int(s[1:]) - 1 for s in parts[2:]]
-
-            # For each user, create a flag that indicates whether the user is assigned to any of the steps
-            user_assignment_flag = [model.NewBoolVar(f'atmostk_user_{u + 1}') for u in range(users_count)]
-            for user in range(users_count):
-                step_user_assignments = [user_assignment[step][user] for step in step_indices]
-                model.AddMaxEquality(user_assignment_flag[user], step_user_assignments)
-            
-            # Sum of flags is less than or equal to k
-            model.Add(sum(user_assignment_flag) <= k)
-            print(f"Applied At-most-k constraint on steps {[s + 1 for s in step_indices]} with max {k} unique users")
-
-        elif parts[0] == "One-team":
-            line = constraint  # Use the entire line for regex parsing
-            steps = re.findall(r's(\d+)', line)
-            group_steps = [int(s) - 1 for s in steps]  # Adjust to 0-based index
-
-            teams_raw = re.findall(r'\(([^)]+)\)', line)
-            team_groups = []
-            for team_str in teams_raw:
-                users = re.findall(r'u(\d+)', team_str)
-                team_groups.append([int(u) - 1 for u in users])  # Adjust to 0-based index
-
-            if not group_steps or not team_groups:
-                print(f"Warning: Unable to parse One-team constraint: {line}")
-                continue  # Skip to next constraint
-
-            team_vars = [model.NewBoolVar(f'one_team_team_{i}_selected') for i in range(len(team_groups))]
-
-            # Ensure exactly one team is selected
-            model.AddExactlyOne(team_vars)
-
-            # If team_var is true for a given team, steps must be assigned to users in that team.
-            # If false, steps cannot be assigned to those users.
-            for t_idx, team in enumerate(team_groups):
-                team_var = team_vars[t_idx]
-                for step in group_steps:
-                    # If this team is selected, the assigned user for this step must be in the team
-                    for user in range(users_count):
-                        if user not in team:
-                            model.Add(user_assignment[step][user] == 0).OnlyEnforceIf(team_var)
-                # Conversely, if this team is not selected, we enforce that steps are not assigned to users in that team
-                for step in group_steps:
-                    for user in team:
-                        model.Add(user_assignment[step][user] == 0).OnlyEnforceIf(team_var.Not())
-
-            print(f"Applied One-team constraint on steps {[s + 1 for s in group_steps]} with teams {[[u + 1 for u in team] for team in team_groups]}")
-
-        elif parts[0] == "User-Capacity":
-            user = int(parts[1][1:]) -1
-            capacity = int(parts[2])
-            user_capacities[user] = capacity
-            print(f"Applied User-Capacity constraint: User u{user + 1} has capacity {capacity}")
-
-    # Apply capacities to users
-    default_capacity = 20
+    The assignment matrix is sparse: user_assignment[step] maps each user authorised for the
+    step to its BoolVar; unauthorised pairs have no variable at all. Steps joined by
+    Binding-of-duty share one dict.
+    """
+    model = cp_model.CpModel()
+    instance = load_instance(problem)
+    steps_count, users_count = instance.steps_count, instance.users_count
+
+    # Binding-of-duty steps always share a user, so each class of bound steps gets one set of
+    # variables, over the users authorised for every step in the class
+    classes = instance.binding_classes
+    step_class = [0] * steps_count
+    class_assignment = []
+    for c_idx, class_steps in enumerate(classes):
+        allowed = instance.step_user_masks[class_steps[0]]
+        for step in class_steps:
+            step_class[step] = c_idx
+            allowed &= instance.step_user_masks[step]
+        class_assignment.append({u: model.NewBoolVar(f'step_{class_steps[0] + 1}_user_{u + 1}')
+                                 for u in range(users_count) if allowed >> u & 1})
+
+    # Create variables: one for each authorised (step, user) pair indicating assignment (1 or 0);
+    # steps of one class share the same dict
+    user_assignment = [class_assignment[step_class[s]] for s in range(steps_count)]
+
+    # Each class of steps is assigned to exactly one (authorised) user
+    for literals in class_assignment:
+        model.AddExactlyOne(literals.values())
+
+    for user, allowed_steps in instance.authorisations.items():
+        log(f"Applied Authorisation constraint for user u{user + 1} on steps {[s + 1 for s in allowed_steps]}")
+
+    for step1, step2 in instance.binding_of_duty:
+        log(f"Applied Binding-of-duty constraint between steps s{step1 + 1} and s{step2 + 1}")
+
+    separated_classes = set()
+    for step1, step2 in instance.separation_of_duty:
+        c1, c2 = sorted((step_class[step1], step_class[step2]))
+        if c1 == c2:
+            # Separation between steps that are bound together can never hold
+            model.AddBoolOr([])
+        elif (c1, c2) not in separated_classes:
+            # Only users authorised for both steps can break the separation
+            separated_classes.add((c1, c2))
+            for user, literal in class_assignment[c1].items():
+                if user in class_assignment[c2]:
+                    model.AddImplication(literal, class_assignment[c2][user].Not())
+        log(f"Applied Separation-of-duty constraint between steps s{step1 + 1} and s{step2 + 1}")
+
+    for k, step_indices in instance.at_most_k:
+        # For each user that may take one of the steps, a flag that indicates whether it does
+        step_user_assignments = {}
+        for c_idx in sorted({step_class[step] for step in step_indices}):
+            for user, literal in class_assignment[c_idx].items():
+                step_user_assignments.setdefault(user, []).append(literal)
+        user_assignment_flag = []
+        for user, literals in step_user_assignments.items():
+            flag = model.NewBoolVar(f'atmostk_user_{user + 1}')
+            model.AddMaxEquality(flag, literals)
+            user_assignment_flag.append(flag)
+
+        # Sum of flags is less than or equal to k
+        model.Add(sum(user_assignment_flag) <= k)
+        log(f"Applied At-most-k constraint on steps {[s + 1 for s in step_indices]} with max {k} unique users")
+
+    for group_steps, team_groups in instance.one_team:
+        team_vars = [model.NewBoolVar(f'one_team_team_{i}_selected') for i in range(len(team_groups))]
+
+        # Ensure exactly one team is selected
+        model.AddExactlyOne(team_vars)
+
+        # If team_var is true for a given team, steps must be assigned to users in that team.
+        # If false, steps cannot be assigned to those users.
+        group_classes = sorted({step_class[step] for step in group_steps})
+        for t_idx, team in enumerate(team_groups):
+            team_var = team_vars[t_idx]
+            members = set(team)
+            for c_idx in group_classes:
+                # If this team is selected, the assigned user for this step must be in the team
+                for user, literal in class_assignment[c_idx].items():
+                    if user not in members:
+                        model.Add(literal == 0).OnlyEnforceIf(team_var)
+            # Conversely, if this team is not selected, we enforce that steps are not assigned to users in that team
+            for c_idx in group_classes:
+                for user in team:
+                    if user in class_assignment[c_idx]:
+                        model.Add(class_assignment[c_idx][user] == 0).OnlyEnforceIf(team_var.Not())
+
+        log(f"Applied One-team constraint on steps {[s + 1 for s in group_steps]} with teams {[[u + 1 for u in team] for team in team_groups]}")
+
+    for user, capacity in instance.user_capacities.items():
+        log(f"Applied User-Capacity constraint: User u{user + 1} has capacity {capacity}")
+
+    # Apply capacities to users that are authorised for more steps than they may take;
+    # a class literal stands for every step in the class, each counted with its weight
+    class_weights = [sum(instance.step_weights[s] for s in class_steps) for class_steps in classes]
     for user in range(users_count):
-        capacity = user_capacities.get(user, default_capacity)
-        assigned_steps = [user_assignment[step][user] for step in range(steps_count)]
-        model.Add(sum(assigned_steps) <= capacity)
-        print(f"User u{user + 1} capacity set to {capacity}")
+        capacity = instance.capacities[user]
+        assigned_classes = [c_idx for c_idx, literals in enumerate(class_assignment) if user in literals]
+        if sum(class_weights[c_idx] for c_idx in assigned_classes) > capacity:
+            model.Add(sum(class_weights[c_idx] * class_assignment[c_idx][user] for c_idx in assigned_classes) <= capacity)
+            log(f"User u{user + 1} capacity set to {capacity}")
 
     # Handle users with no specified authorisations
     for user in range(users_count):
-        if user not in user_authorisations:
-            print(f"User u{user + 1} has no specific authorisations; allowed on any step.")
+        if user not in instance.authorisations:
+            log(f"User u{user + 1} has no specific authorisations; allowed on any step.")
 
     return model, steps_count, users_count, user_assignment
 
 
-def SolverSingleSolution(filename):
-    model, steps_count, users_count, user_assignment = build_model(filename)
+def SolverSingleSolution(problem, time_limit=None, options=None):
+    """Solve for one assignment; `time_limit` (seconds, overriding `options.time_limit`) turns an
+    unfinished search into 'unknown'. `options` is a SolverOptions."""
+    options = SolverOptions.resolve(options, time_limit)
+    timer = PhaseTimer()
+    with timer.phase('parse'):
+        instance = load_instance(problem)
+    with timer.phase('preprocess'):
+        reduced = reduce_instance(instance)
+        certificate = precheck_unsat(instance, reduced)
+    if certificate:
+        return unsat_result(timer, certificate)
+    with timer.phase('build'):
+        model, steps_count, users_count, user_assignment = build_model(reduced.instance)
     solver = cp_model.CpSolver()
-    solver.parameters.cp_model_presolve = True
-    solver.parameters.log_search_progress = False
+    presolve_time = options.configure_cp_sat(solver)
 
-    with Halo("Solving...", spinner='dots'):
+    with Spinner("Solving...", spinner='dots'):
         starttime = int(currenttime() * 1000)
         status = solver.Solve(model)
         endtime = int(currenttime() * 1000)
-    
+    timer.split_solve(solver.WallTime() * 1000, presolve_time())
+
     d = {
         'sat': 'unsat',
         'sol': [],
         'mul_sol': '',
-        'exe_time': f"{endtime - starttime}ms"
+        'exe_time': f"{endtime - starttime}ms",
+        'timings': timer.timings
     }
     
     if status == cp_model.OPTIMAL or status == cp_model.FEASIBLE:
         d['sat'] = 'sat'
-        solution = []
+        values = []
         for s in range(steps_count):
-            for u in range(users_count):
-                if solver.Value(user_assignment[s][u]):
-                    solution.append(f"s{s + 1}: u{u + 1}")
+            for u, literal in user_assignment[s].items():
+                if solver.Value(literal):
+                    values.append(u + 1)
                     break
-        d['sol'] = solution
+        d['sol'] = [f"s{s + 1}: u{user}" for s, user in enumerate(reduced.expand(values))]
+    elif status == cp_model.UNKNOWN:
+        d['sat'] = 'unknown'
 
-    print("Solver status:", solver.StatusName(status))
+    log(f"Solver status: {solver.StatusName(status)}")
     return d
 
 
 class MultiSolutionCollector(cp_model.CpSolverSolutionCallback):
-    def __init__(self, user_assignment, steps_count, users_count, problem_path):
+    def __init__(self, user_assignment, steps_count, users_count, validator, max_solutions=10, timer=None,
+                 expand=None):
         cp_model.CpSolverSolutionCallback.__init__(self)
+        self._expand = expand or list
+        self._timer = timer or PhaseTimer()
+        self._max_solutions = max_solutions
         self._user_assignment = user_assignment
         self._steps_count = steps_count
         self._users_count = users_count
-        self._problem_path = problem_path
+        self._validator = validator
         self._solution_count = 0
+        # Solutions are kept as tuples of users (formatted only by get_solutions) with a set for
+        # the duplicate check, so long enumerations stay linear
         self._found_solutions = []
+        self._seen = set()
+        self.last_key = None
 
     def OnSolutionCallback(self):
         # Extract current solution
-        current_solution = []
+        values = []
         for s in range(self._steps_count):
-            for u in range(self._users_count):
-                if self.Value(self._user_assignment[s][u]):
-                    current_solution.append(f"s{s+1}: u{u+1}")
+            for u, literal in self._user_assignment[s].items():
+                if self.Value(literal):
+                    values.append(u + 1)
                     break
+        key = self.last_key = tuple(values)
 
         # Check if the solution is unique
-        if current_solution not in self._found_solutions:
-            # Validate solution immediately
-            is_valid = validate_solution(self._problem_path, current_solution)
+        if key not in self._seen:
+            self._seen.add(key)
+            values = tuple(self._expand(values))
+            # Validate solution immediately against the validator built once for this instance
+            with self._timer.phase('validation'):
+                is_valid, errors = self._validator.validate(values)
             if is_valid:
                 self._solution_count += 1
-                with Halo(text=f"Solution {self._solution_count} found!", spinner='dots') as spinner:
+                with Spinner(text=f"Solution {self._solution_count} found!", spinner='dots') as spinner:
                     spinner.succeed()
-                self._found_solutions.append(current_solution)
+                self._found_solutions.append(values)
+            else:
+                print("\nSolution Validation Errors:")
+                for error in errors:
+                    print(f"- {error}")
 
-        # Stop after 10 unique solutions
-        if self._solution_count == 10:
+        # Stop after max_solutions unique solutions
+        if self._solution_count == self._max_solutions:
             self.StopSearch()
 
 
-    def get_solutions(self):
+    def get_assignments(self):
+        """Valid solutions found so far, one user per step (1-based)."""
         return self._found_solutions
 
-
-def SolverMultiSolution(filename):
-    model, steps_count, users_count, user_assignment = build_model(filename)
+    def get_solutions(self):
+        return [[f"s{s+1}: u{user}" for s, user in enumerate(values)] for values in self._found_solutions]
+
+
+def add_distance_constraint(model, user_assignment, values, weights, min_distance):
+    """Require solutions to give other users than `values` to steps of total weight `min_distance`."""
+    same = [user_assignment[c_idx][user - 1] for c_idx, user in enumerate(values)]
+    model.Add(cp_model.LinearExpr.WeightedSum(same, weights) <= sum(weights) - min_distance)
+
+
+def SolverMultiSolution(problem, validator=None, max_solutions=10, time_limit=None, min_distance=1, options=None):
+    """Collect up to `max_solutions` solutions within `time_limit` seconds; with `min_distance` > 1
+    any two of them differ on at least that many steps. `options` is a SolverOptions; `time_limit`
+    overrides its time limit."""
+    options = SolverOptions.resolve(options, time_limit, MULTI_SOLUTION_TIME_LIMIT)
+    timer = PhaseTimer()
+    with timer.phase('parse'):
+        instance = load_instance(problem)
+    validator = validator or WorkflowValidator(instance)
+    with timer.phase('preprocess'):
+        reduced = reduce_instance(instance)
+        certificate = precheck_unsat(instance, reduced)
+    if certificate:
+        return unsat_result(timer, certificate, multi=True)
+    with timer.phase('build'):
+        model, steps_count, users_count, user_assignment = build_model(reduced.instance)
     solver = cp_model.CpSolver()
-    solver.parameters.cp_model_presolve = True
-    solver.parameters.log_search_progress = False
-    # Set a timeout of 4000 seconds (4,000,000 ms) for multi-solution mode
-    solver.parameters.max_time_in_seconds = 4000
+    # Without a time limit multi-solution mode stops after MULTI_SOLUTION_TIME_LIMIT (4000) seconds
+    presolve_time = options.configure_cp_sat(solver, enumerate_all=min_distance <= 1)
 
-    collector = MultiSolutionCollector(user_assignment, steps_count, users_count, filename)
+    collector = MultiSolutionCollector(user_assignment, steps_count, users_count, validator, max_solutions, timer,
+                                       reduced.expand)
 
-    with Halo("Solving (Multi-Solution Mode)...", spinner='dots'):
+    with Spinner("Solving (Multi-Solution Mode)...", spinner='dots'):
         starttime = int(currenttime() * 1000)
-        status = solver.SearchForAllSolutions(model, collector)
+        if min_distance > 1:
+            weights = reduced.instance.step_weights
+            status = solve_diverse(
+                solver, model, collector,
+                lambda key: add_distance_constraint(model, user_assignment, key, weights, min_distance),
+                max_solutions, options.time_limit, timer, presolve_time)
+        else:
+            status = solver.SearchForAllSolutions(model, collector)
+            timer.split_solve(solver.WallTime() * 1000, presolve_time())
         endtime = int(currenttime() * 1000)
 
+    if collector.get_solutions():
+        sat = 'sat'
+    else:
+        sat = 'unknown' if status == cp_model.UNKNOWN else 'unsat'
     d = {
-        'sat': 'unsat' if len(collector.get_solutions()) == 0 else 'sat',
+        'sat': sat,
         'mul_sol': collector.get_solutions(),
-        'exe_time': f"{endtime - starttime}ms"
+        'exe_time': f"{endtime - starttime}ms",
+        'timings': timer.timings
     }
 
     return d
 
 
-def validate_solution(problem_path, solution):
-    """Run ValidatorPro on the solution before saving or displaying."""
-    validator = WorkflowValidator()
-    validator.parse_problem(problem_path)
-
-    # Transform solution into a dictionary
-    solution_dict = {}
-    for line in solution:
-        step, user = line.split(': ')
-        solution_dict[int(step[1:])] = int(user[1:])
-
-    spinner = Halo(text="Validating solution", spinner="dots")
-    spinner.start()
-
-    try:
-        is_valid, errors = validator.validate_solution(solution_dict)
-        if is_valid:
-            spinner.succeed("Validation successful!")
-            return True
-        else:
-            spinner.fail("Validation failed.")
-            print("\nSolution Validation Errors:")
-            for error in errors:
-                print(f"- {error}")
-            return False
-    except Exception as e:
-        spinner.fail(f"Validation error: {e}")
-        return False
-
-
-def save_solution(output_dir, file_name, solution_data):
-    os.makedirs(output_dir, exist_ok=True)
-    output_path = os.path.join(output_dir, file_name)
-    with open(output_path, 'w') as file:
-        file.write("\n".join(solution_data))
-    print(f"Solution saved to {output_path}")
-
-
 if __name__ == '__main__':
-    base_path = os.path.dirname(__file__)
-    instances_path = os.path.join(base_path, 'instances')
-    output_base_path = os.path.join(base_path, 'output_doreen')
-
-    # Prompt user for mode selection
-    mode = input("Select mode: (S)ingle Solution or (M)ultiple Solutions? ").strip().lower()
-
-
-    root = tk.Tk()
-    root.withdraw()
-
-    root.attributes('-topmost', True)
-    root.focus_force()
-
-    spinner = Halo(text="Waiting for file selection", spinner="dots")
-    spinner.start()
-
-    try:
-        # File selection dialog
-        dpath = filedialog.askopenfilename(initialdir=instances_path, title="Select file")
-        if dpath:
-            spinner.succeed(f"File selected: {dpath}")
-            folder_name = os.path.basename(os.path.dirname(dpath))
-            file_name = os.path.basename(dpath)
-
-            # Check if the selected file is an example file
-            if file_name.startswith("example"):
-                folder_name = "examples"
-
-            file_prefix = os.path.splitext(file_name)[0]
-            solution_output_dir = os.path.join(output_base_path, folder_name)
-
-            if mode == 'm':
-                # Multi-solution mode
-                solution_output_file = f"multisolution{file_prefix}.txt"
-                d = SolverMultiSolution(dpath)
-                if d['sat'] == 'sat':
-                    # Multiple solutions found
-                    # Combine all solutions into one output
-                    all_solutions_output = [d['sat']]
-                    sol_index = 1
-                    for sol in d['mul_sol']:
-                        all_solutions_output.append(f"Solution {sol_index}:")
-                        all_solutions_output.extend(sol)
-                        sol_index += 1
-                    all_solutions_output.append(f"Time Elapsed: {d['exe_time']}")
-
-                    save_solution(solution_output_dir, solution_output_file, all_solutions_output)
-                    print("\nAll Solutions:")
-                    print("\n".join(all_solutions_output))
-                else:
-                    # No solution found
-                    solution_output = [d['sat'], f"Time Elapsed: {d['exe_time']}"]
-                    save_solution(solution_output_dir, solution_output_file, solution_output)
-                    print("\nNo solutions found.")
-                    print("\n".join(solution_output))
-
-            else:
-                # Single solution mode
-                solution_output_file = f"solution{file_prefix}.txt"
-                d = SolverSingleSolution(dpath)
-                if d['sat'] == 'sat':
-                    # Validate before saving
-                    solution_output = [d['sat']] + d['sol'] + [f"Time Elapsed: {d['exe_time']}"]
-                    if validate_solution(dpath, d['sol']):
-                        save_solution(solution_output_dir, solution_output_file, solution_output)
-                        print("\nSolution:")
-                        print("\n".join(solution_output))
-                    else:
-                        print("\nSolution validation failed. Not saving.")
-                        print("\nSolution:")
-                        print("\n".join([d['sat']] + d['sol']))
-                        print(f"\nTime Elapsed :{d['exe_time']}")
-                else:
-                    # Save unsat status
-                    solution_output = [d['sat']] + d['sol'] + [f"Time Elapsed: {d['exe_time']}"]
-                    save_solution(solution_output_dir, solution_output_file, solution_output)
-                    print("\nSolution:")
-                    print(d['sat'])
-                    print(f"\nTime Elapsed :{d['exe_time']}")
-        else:
-            spinner.fail("No file selected. Exiting.")
-    except Exception as e:
-        spinner.fail(f"Error occurred: {e}")
+    run_solver_gui('output_doreen', SolverSingleSolution, SolverMultiSolution)
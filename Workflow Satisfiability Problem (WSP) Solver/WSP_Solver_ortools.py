@@ -1,158 +1,173 @@
-import os
-import re
 from time import time as currenttime
 from ortools.sat.python import cp_model
-from halo import Halo
-import tkinter as tk
-from tkinter import filedialog
-from helper import transform_output
+from helper import (transform_output, Spinner, log, PhaseTimer, SolverOptions, MULTI_SOLUTION_TIME_LIMIT, solve_diverse,
+                    unsat_result, run_solver_gui)
 from ValidatorPro import WorkflowValidator
+from wsp_instance import load_instance
+from wsp_preprocess import reduce_instance
+from wsp_prechecks import precheck_unsat
 
+# The default At-most-k encoding (see helper.AT_MOST_K_ENCODINGS) is picked per group: the per-user
+# flags let CP-SAT solve the 4- and 5-constraint instances 2-3x faster than the slot variables, but
+# on groups with hundreds of candidate users (examples 16-19, 4-constraint-hard) they slow presolve
+# down so much that instances the slots solve in 10-25s run out of time
+AT_MOST_K_USED_MAX_USERS = 100
 
-def parse_file(filename):
-    with open(filename, 'r') as file:
-        lines = file.readlines()
-    
-    # Parse #Steps, #Users, #Constraints
-    steps_count = int(lines[0].split(': ')[1])
-    users_count = int(lines[1].split(': ')[1])
-    constraints_count = int(lines[2].split(': ')[1])
-    
-    constraints = []
-    for line in lines[3:]:
-        constraints.append(line.strip())
 
-    return steps_count, users_count, constraints
+class IndicatorLiterals:
+    """The `assignments[step] == user` literals of a model, created on first use and shared by every
+    constraint that needs one, so each (step, user) pair is reified once.
 
+    `step` is 0-based like `assignments`, `user` is the 1-based value of the step variable.
+    """
 
-def validate_solution(problem_path, solution):
-    """Run ValidatorPro on the solution before saving or displaying."""
-    validator = WorkflowValidator()
-    validator.parse_problem(problem_path)
+    def __init__(self, model, assignments):
+        self._model = model
+        self._assignments = assignments
+        self._literals = {}
+
+    def __call__(self, step, user):
+        literal = self._literals.get((step, user))
+        if literal is None:
+            literal = self._model.NewBoolVar(f'step_{step + 1}_is_u{user}')
+            self._model.Add(self._assignments[step] == user).OnlyEnforceIf(literal)
+            self._model.Add(self._assignments[step] != user).OnlyEnforceIf(literal.Not())
+            self._literals[(step, user)] = literal
+        return literal
+
+
+def default_at_most_k(instance, step_indices):
+    """Default encoding of one At-most-k group: 'used' unless more than AT_MOST_K_USED_MAX_USERS
+    users are authorised for its steps, 'slots' otherwise."""
+    candidates = 0
+    for s in step_indices:
+        candidates |= instance.step_user_masks[s]
+    return 'used' if bin(candidates).count('1') <= AT_MOST_K_USED_MAX_USERS else 'slots'
+
+
+def add_at_most_k_slots(model, assignments, users_count, k, step_indices, enumerating=False):
+    """At-most-k as k ordered user slots that every step of the group must match.
+
+    With `enumerating` every assignment gets exactly one slot encoding, so that
+    SearchForAllSolutions does not revisit it with different slot values. The extra constraints
+    slow a single solve down considerably, so they are left out otherwise.
+    """
+    if not enumerating:
+        user_vars = [model.NewIntVar(1, users_count, f'atmostk_user_{i}') for i in range(k)]
+        for i in range(k - 1):
+            model.Add(user_vars[i] <= user_vars[i + 1])
+        for s in step_indices:
+            selector_conditions = []
+            for i in range(k):
+                condition = model.NewBoolVar(f'step_{s + 1}_uses_user_{i}')
+                model.Add(assignments[s] == user_vars[i]).OnlyEnforceIf(condition)
+                model.Add(assignments[s] != user_vars[i]).OnlyEnforceIf(condition.Not())
+                selector_conditions.append(condition)
+            model.Add(sum(selector_conditions) == 1)
+        return
+
+    # The group's distinct users in increasing order. Unused slots hold 0 and come first, and
+    # every used slot must serve a step
+    user_vars = [model.NewIntVar(0, users_count, f'atmostk_user_{i}') for i in range(k)]
+    slot_used = [model.NewBoolVar(f'atmostk_slot_{i}_used') for i in range(k)]
+    for i in range(k):
+        model.Add(user_vars[i] >= 1).OnlyEnforceIf(slot_used[i])
+        model.Add(user_vars[i] == 0).OnlyEnforceIf(slot_used[i].Not())
+
+    for i in range(k - 1):
+        model.Add(user_vars[i] <= user_vars[i + 1])
+        model.Add(user_vars[i] < user_vars[i + 1]).OnlyEnforceIf(slot_used[i])
+
+    slot_steps = [[] for _ in range(k)]
+    for s in step_indices:
+        selector_conditions = []
+        for i in range(k):
+            condition = model.NewBoolVar(f'step_{s + 1}_uses_user_{i}')
+            model.Add(assignments[s] == user_vars[i]).OnlyEnforceIf(condition)
+            model.Add(assignments[s] != user_vars[i]).OnlyEnforceIf(condition.Not())
+            selector_conditions.append(condition)
+            slot_steps[i].append(condition)
+        model.Add(sum(selector_conditions) == 1)
+
+    for i in range(k):
+        model.AddBoolOr(slot_steps[i]).OnlyEnforceIf(slot_used[i])
+
+
+def add_at_most_k_used(model, instance, indicators, k, step_indices):
+    """At-most-k as one "takes a step of the group" flag per authorised user, at most k of them set.
+
+    The flags are tied to the IndicatorLiterals of authorised (step, user) pairs only, which CP-SAT
+    maps onto its own encoding of the step variables' domains, so no step is compared with another
+    variable. A group whose steps have k or fewer candidate users needs nothing.
+    """
+    step_literals = {}
+    for s in step_indices:
+        for u in instance.step_users[s]:
+            step_literals.setdefault(u, []).append(indicators(s, u + 1))
+    if len(step_literals) <= k:
+        return
+    used = []
+    for u, literals in step_literals.items():
+        flag = model.NewBoolVar(f'atmostk_u{u + 1}_used')
+        model.AddMaxEquality(flag, literals)
+        used.append(flag)
+    model.Add(sum(used) <= k)
+
+
+def build_model(problem, at_most_k=None, enumerating=False):
+    """Build and return the model, assignments, steps_count, and users_count.
+
+    `at_most_k` is the At-most-k encoding, one of helper.AT_MOST_K_ENCODINGS (default: chosen per
+    group by default_at_most_k). Set `enumerating` when the model is passed to SearchForAllSolutions
+    (see add_at_most_k_slots)."""
+    model = cp_model.CpModel()
+    instance = load_instance(problem)
+    steps_count, users_count = instance.steps_count, instance.users_count
+
+    # Create variables: one for each step, whose domain is the set of users authorised for it
+    assignments = []
+    for i, step_users in enumerate(instance.step_users):
+        if step_users:
+            domain = cp_model.Domain.FromValues([u + 1 for u in step_users])
+            assignments.append(model.NewIntVarFromDomain(domain, f'step_{i + 1}'))
+        else:
+            # An empty domain makes the model invalid rather than infeasible
+            assignments.append(model.NewIntVar(1, users_count, f'step_{i + 1}'))
+            model.AddBoolOr([])
+            log(f"No user is authorised for step s{i + 1}")
 
-    # Transform solution into a dictionary
-    solution_dict = {}
-    for line in solution:
-        step, user = line.split(': ')
-        solution_dict[int(step[1:])] = int(user[1:])
+    for user, allowed_steps in instance.authorisations.items():
+        log(f"Applied Authorisation constraint for user u{user + 1} on steps {[s + 1 for s in allowed_steps]}")
 
-    spinner = Halo(text="Validating solution", spinner="dots")
-    spinner.start()
+    # Every (step, user) indicator below comes from this cache
+    indicators = IndicatorLiterals(model, assignments)
 
-    try:
-        is_valid, errors = validator.validate_solution(solution_dict)
-        if is_valid:
-            spinner.succeed("Validation successful!")
-            return True
-        else:
-            spinner.fail("Validation failed.")
-            print("\nSolution Validation Errors:")
-            for error in errors:
-                print(f"- {error}")
-            return False
-    except Exception as e:
-        spinner.fail(f"Validation error: {e}")
-        return False
+    for step1, step2 in instance.separation_of_duty:
+        model.Add(assignments[step1] != assignments[step2])
+        log(f"Applied Separation-of-duty constraint between steps s{step1 + 1} and s{step2 + 1}")
 
+    for step1, step2 in instance.binding_of_duty:
+        model.Add(assignments[step1] == assignments[step2])
+        log(f"Applied Binding-of-duty constraint between steps s{step1 + 1} and s{step2 + 1}")
 
-def save_solution(output_dir, file_name, solution_data):
-    os.makedirs(output_dir, exist_ok=True)
-    output_path = os.path.join(output_dir, file_name)
-    with open(output_path, 'w') as file:
-        file.write("\n".join(solution_data))
-    print(f"Solution saved to {output_path}")
+    for k, step_indices in instance.at_most_k:
+        if (at_most_k or default_at_most_k(instance, step_indices)) == 'used':
+            add_at_most_k_used(model, instance, indicators, k, step_indices)
+        else:
+            add_at_most_k_slots(model, assignments, users_count, k, step_indices, enumerating)
+        log(f"Applied optimised At-most-k constraint on steps {[s + 1 for s in step_indices]} with max {k} unique users")
 
+    # One-team and capacity handling below works on 1-based steps and users
+    one_team_constraints = [{
+        'steps': [s + 1 for s in steps],
+        'teams': [[u + 1 for u in team] for team in teams],
+        'team_vars': [],
+    } for steps, teams in instance.one_team]
 
-def build_model(filename):
-    """Build and return the model, assignments, steps_count, and users_count."""
-    model = cp_model.CpModel()
-    steps_count, users_count, constraints = parse_file(filename)
-    
-    # Create variables: one for each step
-    assignments = [model.NewIntVar(1, users_count, f'step_{i + 1}') for i in range(steps_count)]
-    
-    user_authorisations = {}
-    user_capacities = {}
-    one_team_constraints = []
-
-    # Parse constraints
-    for constraint in constraints:
-        parts = constraint.split()
-        
-        if parts[0] == "Authorisations":
-            user = int(parts[1][1:])
-            allowed_steps = [int(step[1:]) for step in parts[2:]]
-            
-            if user in user_authorisations:
-                print(f"Warning: User u{user} has multiple authorisations defined; only the first will be used.")
-                continue
-            
-            user_authorisations[user] = allowed_steps
-            for step in range(steps_count):
-                if step + 1 not in allowed_steps:
-                    model.Add(assignments[step] != user)
-            print(f"Applied Authorisation constraint for user u{user} on steps {allowed_steps}")
-
-        elif parts[0] == "Separation-of-duty":
-            step1, step2 = int(parts[1][1:]), int(parts[2][1:])
-            model.Add(assignments[step1 - 1] != assignments[step2 - 1])
-            print(f"Applied Separation-of-duty constraint between steps s{step1} and s{step2}")
-
-        elif parts[0] == "Binding-of-duty":
-            step1, step2 = int(parts[1][1:]), int(parts[2][1:])
-            model.Add(assignments[step1 - 1] == assignments[step2 - 1])
-            print(f"Applied Binding-of-duty constraint between steps s{step1} and s{step2}")
-
-        elif parts[0] == "At-most-k":
-            k = int(parts[1])
-            step_indices = [int(s[1:]) - 1 for s in parts[2:]]
-            group_steps = [assignments[i] for i in step_indices]
-
-            user_vars = [model.NewIntVar(1, users_count, f'atmostk_user_{i}') for i in range(k)]
-            
-            for i in range(k - 1):
-                model.Add(user_vars[i] <= user_vars[i + 1])
-
-            for s in step_indices:
-                selector_conditions = []
-                for i in range(k):
-                    condition = model.NewBoolVar(f'step_{s + 1}_uses_user_{i}')
-                    model.Add(assignments[s] == user_vars[i]).OnlyEnforceIf(condition)
-                    model.Add(assignments[s] != user_vars[i]).OnlyEnforceIf(condition.Not())
-                    selector_conditions.append(condition)
-                model.Add(sum(selector_conditions) == 1)
-            
-            print(f"Applied optimised At-most-k constraint on steps {[s + 1 for s in step_indices]} with max {k} unique users")
-
-        elif parts[0] == "One-team":
-            line = constraint
-            steps = re.findall(r's(\d+)', line)
-            group_steps = [int(s) for s in steps]
-
-            teams_raw = re.findall(r'\(([^)]+)\)', line)
-            team_groups = []
-            for team_str in teams_raw:
-                users = re.findall(r'u(\d+)', team_str)
-                team_groups.append([int(u) for u in users])
-
-            if not group_steps or not team_groups:
-                print(f"Warning: Unable to parse One-team constraint: {line}")
-                continue
-
-            one_team_constraints.append({
-                'steps': group_steps,
-                'teams': team_groups,
-                'team_vars': [],
-            })
-
-        elif parts[0] == "User-Capacity":
-            user = int(parts[1][1:])
-            capacity = int(parts[2])
-            user_capacities[user] = capacity
-            print(f"Applied User-Capacity constraint: User u{user} has capacity {capacity}")
+    for user, capacity in instance.user_capacities.items():
+        log(f"Applied User-Capacity constraint: User u{user + 1} has capacity {capacity}")
 
     # Handle One-Team constraints
-    step_constraints = {}
     for idx, otc in enumerate(one_team_constraints):
         teams = otc['teams']
         steps = otc['steps']
@@ -164,240 +179,202 @@ def build_model(filename):
 
         model.Add(sum(team_vars) == 1)
 
-        for step in steps:
-            if step not in step_constraints:
-                step_constraints[step] = []
-            step_constraints[step].append({
-                'constraint_idx': idx,
-                'team_vars': team_vars,
-                'teams': teams,
-            })
-
         for team_idx, team in enumerate(teams):
             team_var = team_vars[team_idx]
             for step in steps:
-                allowed_users_bools = []
-                for user in team:
-                    user_assigned = model.NewBoolVar(f'step_{step}_user_{user}_team_{idx}_{team_idx}')
-                    model.Add(assignments[step - 1] == user).OnlyEnforceIf(user_assigned)
-                    model.Add(assignments[step - 1] != user).OnlyEnforceIf(user_assigned.Not())
-                    allowed_users_bools.append(user_assigned)
+                # Members not authorised for the step can never be assigned to it; with none left
+                # the empty clause rules the team out
+                allowed_users_bools = [indicators(step - 1, user) for user in team
+                                       if user <= users_count and instance.is_authorised(step - 1, user - 1)]
                 model.AddBoolOr(allowed_users_bools).OnlyEnforceIf(team_var)
 
-    for step, constraints_list in step_constraints.items():
-        if len(constraints_list) > 1:
-            for i in range(len(constraints_list)):
-                for j in range(i + 1, len(constraints_list)):
-                    c1 = constraints_list[i]
-                    c2 = constraints_list[j]
-                    c1_team_vars = c1['team_vars']
-                    c2_team_vars = c2['team_vars']
-                    c1_teams = c1['teams']
-                    c2_teams = c2['teams']
-                    for ti1, team1 in enumerate(c1_teams):
-                        for ti2, team2 in enumerate(c2_teams):
-                            selected_i = c1_team_vars[ti1]
-                            selected_j = c2_team_vars[ti2]
-                            overlap = set(team1).intersection(set(team2))
-                            if not overlap:
-                                model.Add(selected_i + selected_j <= 1)
-
-    # Apply capacities
-    default_capacity = 20
+    # Overlapping One-Team constraints cannot select teams without a common member
+    for c1, t1, c2, t2 in instance.one_team_conflicts:
+        selected_i = one_team_constraints[c1]['team_vars'][t1]
+        selected_j = one_team_constraints[c2]['team_vars'][t2]
+        model.Add(selected_i + selected_j <= 1)
+
+    # Apply capacities. A user can only be given steps it is authorised for, so indicators are
+    # needed for authorised steps only, and not at all when those steps fit within the capacity.
     for user in range(1, users_count + 1):
-        capacity = user_capacities.get(user, default_capacity)
-        
-        assigned_steps = []
-        for i in range(steps_count):
-            is_assigned = model.NewBoolVar(f'step_{i+1}_is_assigned_to_u{user}')
-            model.Add(assignments[i] == user).OnlyEnforceIf(is_assigned)
-            model.Add(assignments[i] != user).OnlyEnforceIf(is_assigned.Not())
-            assigned_steps.append(is_assigned)
-        
-        model.Add(sum(assigned_steps) <= capacity)
-        print(f"User u{user} capacity set to {capacity}")
+        capacity = instance.capacities[user - 1]
+        authorised_steps = instance.authorised_steps(user - 1)
+        load = sum(instance.step_weights[i] for i in authorised_steps)
+        if load <= capacity:
+            log(f"User u{user} capacity {capacity} cannot be exceeded by {load} authorised steps")
+            continue
+
+        assigned_steps = [indicators(i, user) for i in authorised_steps]
+
+        # Each step counts with its weight (the number of original steps merged into it)
+        model.Add(sum(instance.step_weights[i] * is_assigned
+                      for i, is_assigned in zip(authorised_steps, assigned_steps)) <= capacity)
+        log(f"User u{user} capacity set to {capacity}")
 
     # Handle users with no authorisations
     # (No extra constraint needed; it's just a notification)
-    steps_authorised = set()
-    for auth_steps in user_authorisations.values():
-        steps_authorised.update(auth_steps)
     for user in range(1, users_count + 1):
-        if user not in user_authorisations:
-            print(f"User u{user} has no specific authorisations; allowed on any step.")
+        if user - 1 not in instance.authorisations:
+            log(f"User u{user} has no specific authorisations; allowed on any step.")
 
     return model, steps_count, users_count, assignments
 
 
-def SolverSingleSolution(filename):
-    model, steps_count, users_count, assignments = build_model(filename)
+def SolverSingleSolution(problem, time_limit=None, options=None):
+    """Solve for one assignment; `time_limit` (seconds, overriding `options.time_limit`) turns an
+    unfinished search into 'unknown'. `options` is a SolverOptions."""
+    options = SolverOptions.resolve(options, time_limit)
+    timer = PhaseTimer()
+    with timer.phase('parse'):
+        instance = load_instance(problem)
+    with timer.phase('preprocess'):
+        reduced = reduce_instance(instance)
+        certificate = precheck_unsat(instance, reduced)
+    if certificate:
+        return unsat_result(timer, certificate)
+    with timer.phase('build'):
+        model, steps_count, users_count, assignments = build_model(reduced.instance, options.at_most_k)
     solver = cp_model.CpSolver()
-    solver.parameters.cp_model_presolve = True
-    solver.parameters.log_search_progress = False
+    presolve_time = options.configure_cp_sat(solver)
 
-    with Halo("Solving...", spinner='dots'):
+    with Spinner("Solving...", spinner='dots'):
         starttime = int(currenttime() * 1000)
         status = solver.Solve(model)
         endtime = int(currenttime() * 1000)
-    
+    timer.split_solve(solver.WallTime() * 1000, presolve_time())
+
     d = {
         'sat': 'unsat',
         'sol': [],
         'mul_sol': '',
-        'exe_time': f"{endtime - starttime}ms"
+        'exe_time': f"{endtime - starttime}ms",
+        'timings': timer.timings
     }
     
     if status == cp_model.OPTIMAL or status == cp_model.FEASIBLE:
         d['sat'] = 'sat'
-        solution = []
-        for s in range(steps_count):
-            solution.append(f"s{s+1}: u{solver.Value(assignments[s])}")
-        d['sol'] = solution
+        values = reduced.expand([solver.Value(assignment) for assignment in assignments])
+        d['sol'] = [f"s{s+1}: u{user}" for s, user in enumerate(values)]
+    elif status == cp_model.UNKNOWN:
+        d['sat'] = 'unknown'
 
-    print("Solver status:", solver.StatusName(status))
+    log(f"Solver status: {solver.StatusName(status)}")
     return d
 
 
 class MultiSolutionCollector(cp_model.CpSolverSolutionCallback):
-    def __init__(self, assignments, problem_path):
+    def __init__(self, assignments, validator, max_solutions=10, timer=None, expand=None):
         cp_model.CpSolverSolutionCallback.__init__(self)
+        self._expand = expand or list
+        self._timer = timer or PhaseTimer()
         self._assignments = assignments
+        self._max_solutions = max_solutions
         self._solution_count = 0
+        # Solutions are kept as tuples of users (formatted only by get_solutions) with a set for
+        # the duplicate check, so long enumerations stay linear
         self._found_solutions = []
-        self._problem_path = problem_path
+        self._seen = set()
+        self.last_key = None
+        self._validator = validator
 
     def OnSolutionCallback(self):
-        # Extract current solution
-        solution = [f"s{i+1}: u{self.Value(self._assignments[i])}" for i in range(len(self._assignments))]
-
-        # Check if the solution is already in the list
-        if solution in self._found_solutions:
-            return  # Skip duplicates
-
-        # Validate solution immediately
-        is_valid = validate_solution(self._problem_path, solution)
+        # Extract current solution; skip duplicates
+        key = self.last_key = tuple(self.Value(assignment) for assignment in self._assignments)
+        if key in self._seen:
+            return
+        self._seen.add(key)
+        values = tuple(self._expand(key))
+
+        # Validate solution immediately against the validator built once for this instance
+        with self._timer.phase('validation'):
+            is_valid, errors = self._validator.validate(values)
         if is_valid:
             self._solution_count += 1
             # Inform user with a spinner that a new solution is found
-            with Halo(text=f"Solution {self._solution_count} found!", spinner='dots') as spinner:
+            with Spinner(text=f"Solution {self._solution_count} found!", spinner='dots') as spinner:
                 spinner.succeed()
 
-            self._found_solutions.append(solution)
+            self._found_solutions.append(values)
+        else:
+            print("\nSolution Validation Errors:")
+            for error in errors:
+                print(f"- {error}")
 
-        # Stop if 10 unique solutions are collected
-        if self._solution_count == 10:
+        # Stop once enough unique solutions are collected
+        if self._solution_count == self._max_solutions:
             self.StopSearch()
 
 
-    def get_solutions(self):
+    def get_assignments(self):
+        """Valid solutions found so far, one user per step (1-based)."""
         return self._found_solutions
 
-
-def SolverMultiSolution(filename):
-    """Solve the model in multi-solution mode, collecting up to 10 solutions with a timeout."""
-    model, steps_count, users_count, assignments = build_model(filename)
+    def get_solutions(self):
+        return [[f"s{i+1}: u{user}" for i, user in enumerate(values)] for values in self._found_solutions]
+
+
+def add_distance_constraint(model, assignments, values, weights, min_distance):
+    """Require solutions to give other users than `values` to steps of total weight `min_distance`."""
+    differs = []
+    for assignment, value in zip(assignments, values):
+        differ = model.NewBoolVar('')
+        model.Add(assignment != value).OnlyEnforceIf(differ)
+        differs.append(differ)
+    model.Add(cp_model.LinearExpr.WeightedSum(differs, weights) >= min_distance)
+
+
+def SolverMultiSolution(problem, validator=None, max_solutions=10, time_limit=None, min_distance=1, options=None):
+    """Solve the model in multi-solution mode, collecting up to `max_solutions` solutions with a timeout.
+
+    With `min_distance` > 1 any two solutions differ on at least that many steps; they are then
+    found one Solve() at a time, each excluding the neighbourhood of the previous ones.
+    `options` is a SolverOptions; `time_limit` overrides its time limit.
+    """
+    options = SolverOptions.resolve(options, time_limit, MULTI_SOLUTION_TIME_LIMIT)
+    timer = PhaseTimer()
+    with timer.phase('parse'):
+        instance = load_instance(problem)
+    validator = validator or WorkflowValidator(instance)
+    with timer.phase('preprocess'):
+        reduced = reduce_instance(instance)
+        certificate = precheck_unsat(instance, reduced)
+    if certificate:
+        return unsat_result(timer, certificate, multi=True)
+    with timer.phase('build'):
+        model, steps_count, users_count, assignments = build_model(reduced.instance, options.at_most_k,
+                                                                   enumerating=min_distance <= 1)
     solver = cp_model.CpSolver()
-    solver.parameters.cp_model_presolve = True
-    solver.parameters.log_search_progress = False
+    # Without a time limit multi-solution mode stops after MULTI_SOLUTION_TIME_LIMIT (4000) seconds
+    presolve_time = options.configure_cp_sat(solver, enumerate_all=min_distance <= 1)
 
-    # Set a timeout of 4000 seconds (4,000,000 ms) for multi-solution mode
-    solver.parameters.max_time_in_seconds = 4000
+    collector = MultiSolutionCollector(assignments, validator, max_solutions, timer, reduced.expand)
 
-    collector = MultiSolutionCollector(assignments, filename)
-
-    with Halo("Solving (Multi-Solution Mode)...", spinner='dots'):
+    with Spinner("Solving (Multi-Solution Mode)...", spinner='dots'):
         starttime = int(currenttime() * 1000)
-        status = solver.SearchForAllSolutions(model, collector)
+        if min_distance > 1:
+            weights = reduced.instance.step_weights
+            status = solve_diverse(
+                solver, model, collector,
+                lambda key: add_distance_constraint(model, assignments, key, weights, min_distance),
+                max_solutions, options.time_limit, timer, presolve_time)
+        else:
+            status = solver.SearchForAllSolutions(model, collector)
+            timer.split_solve(solver.WallTime() * 1000, presolve_time())
         endtime = int(currenttime() * 1000)
 
+    if collector.get_solutions():
+        sat = 'sat'
+    else:
+        sat = 'unknown' if status == cp_model.UNKNOWN else 'unsat'
     d = {
-        'sat': 'unsat' if len(collector.get_solutions()) == 0 else 'sat',
+        'sat': sat,
         'mul_sol': collector.get_solutions(),
-        'exe_time': f"{endtime - starttime}ms"
+        'exe_time': f"{endtime - starttime}ms",
+        'timings': timer.timings
     }
 
     return d
 
 
 if __name__ == '__main__':
-    base_path = os.path.dirname(__file__)
-    instances_path = os.path.join(base_path, 'instances')
-    output_base_path = os.path.join(base_path, 'output_ortools')
-
-    # Prompt user for mode selection
-    mode = input("Select mode: (S)ingle Solution or (M)ultiple Solutions? ").strip().lower()
-
-    root = tk.Tk()
-    root.withdraw()
-    
-    root.attributes('-topmost', True)
-    root.focus_force()
-
-    spinner = Halo(text="Waiting for file selection", spinner="dots")
-    spinner.start()
-
-    try:
-        dpath = filedialog.askopenfilename(initialdir=instances_path, title="Select file")
-        if dpath:
-            spinner.succeed(f"File selected: {dpath}")
-            folder_name = os.path.basename(os.path.dirname(dpath))
-            file_name = os.path.basename(dpath)
-
-            if file_name.startswith("example"):
-                folder_name = "examples"
-
-            file_prefix = os.path.splitext(file_name)[0]
-            solution_output_dir = os.path.join(output_base_path, folder_name)
-
-            if mode == 'm':
-                # Multi-solution mode
-                solution_output_file = f"multisolution{file_prefix}.txt"
-                d = SolverMultiSolution(dpath)
-                if d['sat'] == 'sat':
-                    # Multiple solutions found
-                    # Combine all solutions into one output
-                    all_solutions_output = [d['sat']]
-                    sol_index = 1
-                    for sol in d['mul_sol']:
-                        all_solutions_output.append(f"Solution {sol_index}:")
-                        all_solutions_output.extend(sol)
-                        sol_index += 1
-                    all_solutions_output.append(f"Time Elapsed: {d['exe_time']}")
-
-                    save_solution(solution_output_dir, solution_output_file, all_solutions_output)
-                    print("\nAll Solutions:")
-                    print("\n".join(all_solutions_output))
-                else:
-                    # No solution found
-                    solution_output = [d['sat'], f"Time Elapsed: {d['exe_time']}"]
-                    save_solution(solution_output_dir, solution_output_file, solution_output)
-                    print("\nNo solutions found.")
-                    print("\n".join(solution_output))
-
-            else:
-                # Single solution mode
-                solution_output_file = f"solution{file_prefix}.txt"
-                d = SolverSingleSolution(dpath)
-                if d['sat'] == 'sat':
-                    # Validate before saving
-                    solution_output = [d['sat']] + d['sol'] + [f"Time Elapsed: {d['exe_time']}"]
-                    if validate_solution(dpath, d['sol']):
-                        save_solution(solution_output_dir, solution_output_file, solution_output)
-                        print("\nSolution:")
-                        print("\n".join(solution_output))
-                    else:
-                        print("\nSolution validation failed. Not saving.")
-                        print("\nSolution:")
-                        print("\n".join([d['sat']] + d['sol']))
-                        print(f"\nTime Elapsed :{d['exe_time']}")
-                else:
-                    # Save unsat status
-                    solution_output = [d['sat']] + d['sol'] + [f"Time Elapsed: {d['exe_time']}"]
-                    save_solution(solution_output_dir, solution_output_file, solution_output)
-                    print("\nSolution:")
-                    print(d['sat'])
-                    print(f"\nTime Elapsed :{d['exe_time']}")
-        else:
-            spinner.fail("No file selected. Exiting.")
-    except Exception as e:
-        spinner.fail(f"Error occurred: {e}")
+    run_solver_gui('output_ortools', SolverSingleSolution, SolverMultiSolution)
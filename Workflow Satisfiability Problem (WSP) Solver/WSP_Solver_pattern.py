@@ -0,0 +1,367 @@
+from time import time as currenttime, perf_counter
+
+from helper import (Spinner, log, PhaseTimer, SolverOptions, MULTI_SOLUTION_TIME_LIMIT, unsat_result, run_solver_gui)
+from ValidatorPro import WorkflowValidator
+from wsp_instance import load_instance
+from wsp_preprocess import reduce_instance
+from wsp_prechecks import precheck_unsat
+
+
+def _bits(mask):
+    """Indices of the set bits of `mask`, lowest first."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class SearchTimeout(Exception):
+    """The pattern search ran past its deadline."""
+
+
+class PatternSearch:
+    """Backtracking over patterns: partitions of the steps into blocks that each go to one user.
+
+    Separation-of-duty and at-most-k only depend on which steps share a user, so they are checked
+    on the partition itself; authorisations and capacities decide whether the blocks can be given
+    to distinct users, which is a bipartite matching kept up to date as steps are placed. One-team
+    is the only user-dependent constraint: the team of a group is chosen when its first step is
+    placed and narrows the users of every block holding one of its steps. A step goes either into
+    an existing block or into a new one, so each pattern is visited once per team choice.
+
+    The next step is always the one with the fewest blocks left to join (forward checking): the
+    search backtracks as soon as some unplaced step has none.
+
+    Works on a reduced instance (Binding-of-duty already merged); users are 0-based.
+    """
+
+    def __init__(self, instance, deadline=None):
+        self.steps_count = instance.steps_count
+        self.deadline = deadline
+        self.step_masks = instance.step_user_masks
+        self.weights = instance.step_weights
+        self.capacities = instance.capacities
+
+        self.separation = [0] * self.steps_count
+        for step1, step2 in instance.separation_of_duty:
+            self.separation[step1] |= 1 << step2
+            self.separation[step2] |= 1 << step1
+        self.at_most_k = [k for k, _ in instance.at_most_k]
+        self.step_at_most_k = [[] for _ in range(self.steps_count)]
+        for g_idx, (_, steps) in enumerate(instance.at_most_k):
+            for step in steps:
+                self.step_at_most_k[step].append(g_idx)
+        self.team_masks = [[sum(1 << u for u in set(team) if u < instance.users_count) for team in teams]
+                           for _, teams in instance.one_team]
+        self.step_teams = [[] for _ in range(self.steps_count)]
+        for g_idx, (steps, _) in enumerate(instance.one_team):
+            for step in set(steps):
+                self.step_teams[step].append(g_idx)
+
+        # Ties in the dynamic ordering go to the steps with fewest users, then most SoD partners
+        self.order = sorted(range(self.steps_count),
+                            key=lambda s: (bin(self.step_masks[s]).count('1'), -bin(self.separation[s]).count('1')))
+        self.nodes = 0
+
+    def _capacity_mask(self, weight):
+        """Users whose capacity covers a block of `weight` steps."""
+        if weight not in self._capacity_masks:
+            self._capacity_masks[weight] = sum(1 << u for u, c in enumerate(self.capacities) if c >= weight)
+        return self._capacity_masks[weight]
+
+    # Matching of blocks to distinct users
+
+    def _augment(self, block, visited):
+        users = self.block_users[block]
+        free = users & ~self.used
+        if free:
+            user = (free & -free).bit_length() - 1
+            self._assign(block, user)
+            return True
+        for user in _bits(users & ~visited[0]):
+            visited[0] |= 1 << user
+            if self._augment(self.owner[user], visited):
+                self._assign(block, user)
+                return True
+        return False
+
+    def _assign(self, block, user):
+        self.match[block] = user
+        self.owner[user] = block
+        self.used |= 1 << user
+
+    def _matches(self, block):
+        """Re-match `block` after its users shrank; False if the blocks can no longer get distinct users."""
+        user = self.match[block]
+        if user is not None and self.block_users[block] >> user & 1:
+            return True
+        if user is not None:
+            del self.owner[user]
+            self.used &= ~(1 << user)
+            self.match[block] = None
+        return self._augment(block, [0])
+
+    # Search
+
+    def _candidates(self, step):
+        """(team choices, user restriction) pairs for placing `step`, branching on undecided teams."""
+        options = [({}, -1)]
+        for g_idx in self.step_teams[step]:
+            if self.team_choice[g_idx] is not None:
+                options = [(choices, mask & self.team_masks[g_idx][self.team_choice[g_idx]]) for choices, mask in options]
+            else:
+                options = [({**choices, g_idx: t_idx}, mask & team_mask)
+                           for choices, mask in options for t_idx, team_mask in enumerate(self.team_masks[g_idx])]
+        return [(choices, mask) for choices, mask in options if mask]
+
+    def _options(self, step):
+        """Number of blocks (an existing one or a new one) `step` could still join, ignoring teams
+        and capacities."""
+        full = [g for g in self.step_at_most_k[step] if len(self.group_blocks[g]) >= self.at_most_k[g]]
+        separation, users = self.separation[step], self.step_masks[step]
+        count = 0 if full else 1
+        for block, block_steps in enumerate(self.block_steps):
+            if (not block_steps & separation and self.block_users[block] & users
+                    and all(block in self.group_blocks[g] for g in full)):
+                count += 1
+        return count
+
+    def _next_step(self):
+        """The unplaced step with the fewest options, or None if some step has none left."""
+        best, best_count = None, None
+        for step in self.order:
+            if self.block_of[step] is not None:
+                continue
+            count = self._options(step)
+            if count == 0:
+                return None
+            if best is None or count < best_count:
+                best, best_count = step, count
+                if count == 1:
+                    break
+        return best
+
+    def _place(self, placed):
+        if placed == self.steps_count:
+            yield
+            return
+        self.nodes += 1
+        if self.deadline is not None and self.nodes % 256 == 0 and perf_counter() > self.deadline:
+            raise SearchTimeout()
+        step = self._next_step()
+        if step is None:
+            return
+        step_bit, weight = 1 << step, self.weights[step]
+        for choices, restriction in self._candidates(step):
+            for g_idx, t_idx in choices.items():
+                self.team_choice[g_idx] = t_idx
+            for block in range(len(self.block_steps) + 1):
+                new_block = block == len(self.block_steps)
+                if not new_block and self.block_steps[block] & self.separation[step]:
+                    continue
+                if any(block not in self.group_blocks[g] and len(self.group_blocks[g]) >= self.at_most_k[g]
+                       for g in self.step_at_most_k[step]):
+                    continue
+                block_weight = weight + (0 if new_block else self.block_weight[block])
+                users = self.step_masks[step] & restriction & self._capacity_mask(block_weight)
+                if not new_block:
+                    users &= self.block_users[block]
+                if not users:
+                    continue
+
+                saved = (list(self.match), dict(self.owner), self.used)
+                if new_block:
+                    self.block_steps.append(step_bit)
+                    self.block_users.append(users)
+                    self.block_weight.append(block_weight)
+                    self.match.append(None)
+                    saved = (saved[0] + [None],) + saved[1:]
+                else:
+                    previous = (self.block_users[block], self.block_weight[block])
+                    self.block_steps[block] |= step_bit
+                    self.block_users[block] = users
+                    self.block_weight[block] = block_weight
+                for g in self.step_at_most_k[step]:
+                    self.group_blocks[g][block] = self.group_blocks[g].get(block, 0) + 1
+                self.block_of[step] = block
+
+                if self._matches(block):
+                    yield from self._place(placed + 1)
+
+                self.match, self.owner, self.used = saved
+                for g in self.step_at_most_k[step]:
+                    self.group_blocks[g][block] -= 1
+                    if not self.group_blocks[g][block]:
+                        del self.group_blocks[g][block]
+                if new_block:
+                    self.block_steps.pop()
+                    self.block_users.pop()
+                    self.block_weight.pop()
+                    self.match.pop()
+                else:
+                    self.block_steps[block] &= ~step_bit
+                    self.block_users[block], self.block_weight[block] = previous
+                self.block_of[step] = None
+            for g_idx in choices:
+                self.team_choice[g_idx] = None
+
+    def patterns(self):
+        """Yield once per feasible pattern; while suspended, `match` and `block_of` describe it."""
+        self._capacity_masks = {}
+        self.block_steps, self.block_users, self.block_weight = [], [], []
+        self.match, self.owner, self.used = [], {}, 0
+        self.block_of = [None] * self.steps_count
+        self.group_blocks = [{} for _ in self.at_most_k]
+        self.team_choice = [None] * len(self.team_masks)
+        yield from self._place(0)
+
+    def assignment(self, block_users=None):
+        """User (0-based) of every step for the current pattern and block users."""
+        block_users = block_users or self.match
+        return [block_users[block] for block in self.block_of]
+
+    def matchings(self):
+        """Every way to give the current pattern's blocks distinct users, starting with `match`.
+        The deadline is checked before every candidate, so callers that reject most of them
+        still stop on time (SearchTimeout)."""
+        yield list(self.match)
+        first = tuple(self.match)
+        for users in self._extend([], 0):
+            if self.deadline is not None and perf_counter() > self.deadline:
+                raise SearchTimeout()
+            if tuple(users) != first:
+                yield users
+
+    def _extend(self, chosen, used):
+        block = len(chosen)
+        if block == len(self.block_users):
+            yield list(chosen)
+            return
+        for user in _bits(self.block_users[block] & ~used):
+            if self._completable(block + 1, used | 1 << user):
+                chosen.append(user)
+                yield from self._extend(chosen, used | 1 << user)
+                chosen.pop()
+
+    def _completable(self, first_block, used):
+        """Whether blocks first_block.. can still get distinct users outside `used`."""
+        owner = {}
+
+        def augment(block, visited):
+            for user in _bits(self.block_users[block] & ~used & ~visited[0]):
+                visited[0] |= 1 << user
+                if user not in owner or augment(owner[user], visited):
+                    owner[user] = block
+                    return True
+            return False
+
+        return all(augment(block, [0]) for block in range(first_block, len(self.block_users)))
+
+
+def SolverSingleSolution(problem, time_limit=None, options=None):
+    """Solve for one assignment; `time_limit` (seconds, overriding `options.time_limit`) turns an
+    unfinished search into 'unknown'. Of the SolverOptions only the time limit applies."""
+    options = SolverOptions.resolve(options, time_limit)
+    timer = PhaseTimer()
+    with timer.phase('parse'):
+        instance = load_instance(problem)
+    with timer.phase('preprocess'):
+        reduced = reduce_instance(instance)
+        certificate = precheck_unsat(instance, reduced)
+    if certificate:
+        return unsat_result(timer, certificate)
+    with timer.phase('build'):
+        deadline = None if options.time_limit is None else perf_counter() + options.time_limit
+        search = PatternSearch(reduced.instance, deadline)
+
+    d = {
+        'sat': 'unsat',
+        'sol': [],
+        'mul_sol': '',
+        'timings': timer.timings
+    }
+    with Spinner("Solving...", spinner='dots'):
+        starttime = int(currenttime() * 1000)
+        with timer.phase('search'):
+            try:
+                for _ in search.patterns():
+                    values = reduced.expand([user + 1 for user in search.assignment()])
+                    d['sat'] = 'sat'
+                    d['sol'] = [f"s{s+1}: u{user}" for s, user in enumerate(values)]
+                    break
+            except SearchTimeout:
+                d['sat'] = 'unknown'
+        endtime = int(currenttime() * 1000)
+    d['exe_time'] = f"{endtime - starttime}ms"
+
+    log(f"Pattern search: {d['sat']} after {search.nodes} nodes")
+    return d
+
+
+def SolverMultiSolution(problem, validator=None, max_solutions=10, time_limit=None, min_distance=1, options=None):
+    """Collect up to `max_solutions` distinct solutions, trying every matching of a pattern before
+    moving to the next pattern; candidates closer than `min_distance` steps to a solution already
+    found are skipped. Of the SolverOptions only the time limit applies."""
+    options = SolverOptions.resolve(options, time_limit, MULTI_SOLUTION_TIME_LIMIT)
+    timer = PhaseTimer()
+    with timer.phase('parse'):
+        instance = load_instance(problem)
+    validator = validator or WorkflowValidator(instance)
+    with timer.phase('preprocess'):
+        reduced = reduce_instance(instance)
+        certificate = precheck_unsat(instance, reduced)
+    if certificate:
+        return unsat_result(timer, certificate, multi=True)
+    with timer.phase('build'):
+        search = PatternSearch(reduced.instance, perf_counter() + options.time_limit)
+
+    found_solutions, seen_solutions, seen = [], [], set()
+    timed_out = False
+    with Spinner("Solving (Multi-Solution Mode)...", spinner='dots'):
+        starttime = int(currenttime() * 1000)
+        search_start = perf_counter()
+        try:
+            for _ in search.patterns():
+                for block_users in search.matchings():
+                    values = reduced.expand([user + 1 for user in search.assignment(block_users)])
+                    # Overlapping teams can lead to the same assignment under two team choices
+                    if tuple(values) in seen:
+                        continue
+                    seen.add(tuple(values))
+                    if min_distance > 1 and any(sum(a != b for a, b in zip(values, other)) < min_distance
+                                                for other in seen_solutions):
+                        continue
+                    with timer.phase('validation'):
+                        is_valid, errors = validator.validate(values)
+                    if not is_valid:
+                        print("\nSolution Validation Errors:")
+                        for error in errors:
+                            print(f"- {error}")
+                        continue
+                    seen_solutions.append(values)
+                    found_solutions.append([f"s{i+1}: u{user}" for i, user in enumerate(values)])
+                    with Spinner(text=f"Solution {len(found_solutions)} found!", spinner='dots') as spinner:
+                        spinner.succeed()
+                    if len(found_solutions) == max_solutions:
+                        break
+                if len(found_solutions) == max_solutions:
+                    break
+        except SearchTimeout:
+            timed_out = True
+        timer.timings['search'] += (perf_counter() - search_start) * 1000 - timer.timings['validation']
+        endtime = int(currenttime() * 1000)
+
+    if found_solutions:
+        sat = 'sat'
+    else:
+        sat = 'unknown' if timed_out else 'unsat'
+    return {
+        'sat': sat,
+        'mul_sol': found_solutions,
+        'exe_time': f"{endtime - starttime}ms",
+        'timings': timer.timings
+    }
+
+
+if __name__ == '__main__':
+    run_solver_gui('output_pattern', SolverSingleSolution, SolverMultiSolution)
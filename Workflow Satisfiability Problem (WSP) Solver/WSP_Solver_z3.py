@@ -1,146 +1,60 @@
-import os
-import re
 from time import time as currenttime
-from halo import Halo
-import tkinter as tk
-from tkinter import filedialog
-from z3 import Solver, Int, Bool, Or, And, Not, If, Sum, Implies, sat, unknown
+from z3 import Solver, Int, Bool, Or, And, Not, If, Sum, Implies, AtMost, sat, unknown
 
-from helper import transform_output
+from helper import (transform_output, Spinner, log, PhaseTimer, SolverOptions, MULTI_SOLUTION_TIME_LIMIT, unsat_result,
+                    run_solver_gui)
 from ValidatorPro import WorkflowValidator
+from wsp_instance import load_instance
+from wsp_preprocess import reduce_instance
+from wsp_prechecks import precheck_unsat
 
-def parse_file(filename):
-    with open(filename, 'r') as file:
-        lines = file.readlines()
-    
-    # Parse #Steps, #Users, #Constraints
-    steps_count = int(lines[0].split(': ')[1])
-    users_count = int(lines[1].split(': ')[1])
-    constraints_count = int(lines[2].split(': ')[1])
-    
-    constraints = []
-    for line in lines[3:]:
-        line_stripped = line.strip()
-        if line_stripped:
-            constraints.append(line_stripped)
-    return steps_count, users_count, constraints
-
-
-def validate_solution(problem_path, solution):
-    """Run ValidatorPro on the solution before saving or displaying."""
-    validator = WorkflowValidator()
-    validator.parse_problem(problem_path)
-
-    # Transform solution into a dictionary
-    solution_dict = {}
-    for line in solution:
-        step, user = line.split(': ')
-        solution_dict[int(step[1:])] = int(user[1:])
-
-    spinner = Halo(text="Validating solution", spinner="dots")
-    spinner.start()
-
-    try:
-        is_valid, errors = validator.validate_solution(solution_dict)
-        if is_valid:
-            spinner.succeed("Validation successful!")
-            return True
-        else:
-            spinner.fail("Validation failed.")
-            print("\nSolution Validation Errors:")
-            for error in errors:
-                print(f"- {error}")
-            return False
-    except Exception as e:
-        spinner.fail(f"Validation error: {e}")
-        return False
-
-
-def save_solution(output_dir, file_name, solution_data):
-    os.makedirs(output_dir, exist_ok=True)
-    output_path = os.path.join(output_dir, file_name)
-    with open(output_path, 'w') as file:
-        file.write("\n".join(solution_data))
-    print(f"Solution saved to {output_path}")
-
-
-def build_z3_model(filename):
-    """Builds the Z3 model based on the given file, returns solver, assignments, steps_count, users_count."""
+# Default At-most-k encoding (see helper.AT_MOST_K_ENCODINGS): the per-user flags make z3's search
+# faster too, but building one implication per authorised (step, user) pair costs more than that
+AT_MOST_K_ENCODING = 'slots'
+
+
+def build_z3_model(problem, at_most_k=None):
+    """Builds the Z3 model for the given instance, returns solver, assignments, steps_count, users_count.
+
+    `at_most_k` is the At-most-k encoding, one of helper.AT_MOST_K_ENCODINGS (default:
+    AT_MOST_K_ENCODING)."""
+    at_most_k = at_most_k or AT_MOST_K_ENCODING
     solver = Solver()
-    steps_count, users_count, constraints = parse_file(filename)
+    instance = load_instance(problem)
+    steps_count, users_count = instance.steps_count, instance.users_count
 
-    # Create variables: one for each step
+    # Create variables: one for each step, restricted to the users authorised for it
     assignments = [Int(f'step_{i + 1}') for i in range(steps_count)]
-    for i in range(steps_count):
+    for i, step_users in enumerate(instance.step_users):
         solver.add(assignments[i] >= 1, assignments[i] <= users_count)
+        if len(step_users) < users_count:
+            solver.add(Or([assignments[i] == u + 1 for u in step_users]))
+
+    for user, allowed_steps in instance.authorisations.items():
+        log(f"Applied Authorisation constraint for user u{user + 1} on steps {[s + 1 for s in allowed_steps]}")
 
-    user_authorisations = {}
-    user_capacities = {}
-    one_team_constraints = []
-    at_most_k_constraints = []
-
-    for constraint in constraints:
-        parts = constraint.split()
-
-        if parts[0] == "Authorisations":
-            user = int(parts[1][1:])
-            allowed_steps = [int(step[1:]) for step in parts[2:]]
-
-            if user in user_authorisations:
-                print(f"Warning: User u{user} has multiple authorisations defined; only the first will be used.")
-                continue
-
-            user_authorisations[user] = allowed_steps
-            for step in range(steps_count):
-                if (step + 1) not in allowed_steps:
-                    solver.add(assignments[step] != user)
-            print(f"Applied Authorisation constraint for user u{user} on steps {allowed_steps}")
-
-        elif parts[0] == "Separation-of-duty":
-            step1, step2 = int(parts[1][1:]), int(parts[2][1:])
-            solver.add(assignments[step1 - 1] != assignments[step2 - 1])
-            print(f"Applied Separation-of-duty constraint between steps s{step1} and s{step2}")
-
-        elif parts[0] == "Binding-of-duty":
-            step1, step2 = int(parts[1][1:]), int(parts[2][1:])
-            solver.add(assignments[step1 - 1] == assignments[step2 - 1])
-            print(f"Applied Binding-of-duty constraint between steps s{step1} and s{step2}")
-
-        elif parts[0] == "At-most-k":
-            k = int(parts[1])
-            step_indices = [int(s[1:]) - 1 for s in parts[2:]]
-            at_most_k_constraints.append((k, step_indices))
-            print(f"Found At-most-k constraint on steps {[s + 1 for s in step_indices]} with max {k} unique users")
-
-        elif parts[0] == "One-team":
-            line = constraint
-            steps_match = re.findall(r's(\d+)', line)
-            group_steps = [int(s) for s in steps_match]
-
-            teams_raw = re.findall(r'\(([^)]+)\)', line)
-            team_groups = []
-            for team_str in teams_raw:
-                users_matched = re.findall(r'u(\d+)', team_str)
-                team_groups.append([int(u) for u in users_matched])
-
-            if not group_steps or not team_groups:
-                print(f"Warning: Unable to parse One-team constraint: {line}")
-                continue
-
-            one_team_constraints.append({
-                'steps': group_steps,
-                'teams': team_groups,
-                'team_vars': [],
-            })
-
-        elif parts[0] == "User-Capacity":
-            user = int(parts[1][1:])
-            capacity = int(parts[2])
-            user_capacities[user] = capacity
-            print(f"Applied User-Capacity constraint: User u{user} has capacity {capacity}")
+    for step1, step2 in instance.separation_of_duty:
+        solver.add(assignments[step1] != assignments[step2])
+        log(f"Applied Separation-of-duty constraint between steps s{step1 + 1} and s{step2 + 1}")
+
+    for step1, step2 in instance.binding_of_duty:
+        solver.add(assignments[step1] == assignments[step2])
+        log(f"Applied Binding-of-duty constraint between steps s{step1 + 1} and s{step2 + 1}")
+
+    for k, step_indices in instance.at_most_k:
+        log(f"Found At-most-k constraint on steps {[s + 1 for s in step_indices]} with max {k} unique users")
+
+    # One-team and capacity handling below works on 1-based steps and users
+    one_team_constraints = [{
+        'steps': [s + 1 for s in steps],
+        'teams': [[u + 1 for u in team] for team in teams],
+        'team_vars': [],
+    } for steps, teams in instance.one_team]
+
+    for user, capacity in instance.user_capacities.items():
+        log(f"Applied User-Capacity constraint: User u{user + 1} has capacity {capacity}")
 
     # Process One-Team constraints
-    step_constraints = {}
     for idx, otc in enumerate(one_team_constraints):
         teams = otc['teams']
         steps = otc['steps']
@@ -150,231 +64,213 @@ def build_z3_model(filename):
         # Exactly one team is selected
         solver.add(Sum([If(tv, 1, 0) for tv in team_vars]) == 1)
 
-        # Track constraints per step
-        for step in steps:
-            if step not in step_constraints:
-                step_constraints[step] = []
-            step_constraints[step].append({
-                'constraint_idx': idx,
-                'team_vars': team_vars,
-                'teams': teams,
-            })
-
         # If a team is selected, the assigned user must be from that team
         for team_idx, team in enumerate(teams):
             team_var = team_vars[team_idx]
             for step in steps:
                 solver.add(Implies(team_var, Or([assignments[step - 1] == u for u in team])))
 
-    # Handle overlapping steps between One-Team constraints
-    for step, constraints_list in step_constraints.items():
-        if len(constraints_list) > 1:
-            for i in range(len(constraints_list)):
-                for j in range(i + 1, len(constraints_list)):
-                    c1 = constraints_list[i]
-                    c2 = constraints_list[j]
-                    c1_team_vars = c1['team_vars']
-                    c2_team_vars = c2['team_vars']
-                    c1_teams = c1['teams']
-                    c2_teams = c2['teams']
-                    for ti1, team1 in enumerate(c1_teams):
-                        for ti2, team2 in enumerate(c2_teams):
-                            selected_i = c1_team_vars[ti1]
-                            selected_j = c2_team_vars[ti2]
-                            overlap = set(team1).intersection(set(team2))
-                            if not overlap:
-                                solver.add(Not(And(selected_i, selected_j)))
+    # Overlapping One-Team constraints cannot select teams without a common member
+    for c1, t1, c2, t2 in instance.one_team_conflicts:
+        selected_i = one_team_constraints[c1]['team_vars'][t1]
+        selected_j = one_team_constraints[c2]['team_vars'][t2]
+        solver.add(Not(And(selected_i, selected_j)))
 
     # Apply capacities
-    default_capacity = 20
     for user in range(1, users_count + 1):
-        capacity = user_capacities.get(user, default_capacity)
-        solver.add(Sum([If(assignments[i] == user, 1, 0) for i in range(steps_count)]) <= capacity)
-        print(f"User u{user} capacity set to {capacity}")
+        capacity = instance.capacities[user - 1]
+        # Each step counts with its weight (the number of original steps merged into it)
+        solver.add(Sum([If(assignments[i] == user, instance.step_weights[i], 0) for i in range(steps_count)]) <= capacity)
+        log(f"User u{user} capacity set to {capacity}")
 
     # Authorisations: no special handling needed if not given, allowed on any step
     for user in range(1, users_count + 1):
-        if user not in user_authorisations:
-            print(f"User u{user} has no specific authorisations; allowed on any step.")
+        if user - 1 not in instance.authorisations:
+            log(f"User u{user} has no specific authorisations; allowed on any step.")
 
     # Encode At-most-k constraints
     constraint_counter = 0
-    for (k, step_indices) in at_most_k_constraints:
-        user_vars = [Int(f'atmostk_{constraint_counter}_{j}') for j in range(k)]
-        for uv in user_vars:
-            solver.add(uv >= 1, uv <= users_count)
-        # Symmetry breaking
-        for i in range(k - 1):
-            solver.add(user_vars[i] <= user_vars[i + 1])
-
-        # Each step in this group must be assigned to one of the user_vars
-        for s in step_indices:
-            solver.add(Or([assignments[s] == uv for uv in user_vars]))
+    for (k, step_indices) in instance.at_most_k:
+        if at_most_k == 'used':
+            # One flag per user authorised for a step of the group; a step's user raises its flag
+            user_steps = {}
+            for s in step_indices:
+                for u in instance.step_users[s]:
+                    user_steps.setdefault(u, []).append(s)
+            if len(user_steps) > k:
+                used = []
+                for u, steps in user_steps.items():
+                    flag = Bool(f'atmostk_{constraint_counter}_u{u + 1}_used')
+                    solver.add([Implies(assignments[s] == u + 1, flag) for s in steps])
+                    used.append(flag)
+                solver.add(AtMost(*used, k))
+        else:
+            user_vars = [Int(f'atmostk_{constraint_counter}_{j}') for j in range(k)]
+            for uv in user_vars:
+                solver.add(uv >= 1, uv <= users_count)
+            # Symmetry breaking
+            for i in range(k - 1):
+                solver.add(user_vars[i] <= user_vars[i + 1])
+
+            # Each step in this group must be assigned to one of the user_vars
+            for s in step_indices:
+                solver.add(Or([assignments[s] == uv for uv in user_vars]))
 
         constraint_counter += 1
-        print(f"Applied At-most-k constraint on steps {[s + 1 for s in step_indices]} with max {k} unique users")
+        log(f"Applied At-most-k constraint on steps {[s + 1 for s in step_indices]} with max {k} unique users")
 
     return solver, assignments, steps_count, users_count
 
 
-def solve_single_solution(filename):
-    """Solve the model in single-solution mode."""
-    solver, assignments, steps_count, users_count = build_z3_model(filename)
-
-    with Halo("Solving...", spinner='dots'):
+def solve_single_solution(problem, time_limit=None, options=None):
+    """Solve the model in single-solution mode; `time_limit` (seconds, overriding `options.time_limit`)
+    turns an unfinished search into 'unknown'. `options` is a SolverOptions."""
+    options = SolverOptions.resolve(options, time_limit)
+    timer = PhaseTimer()
+    with timer.phase('parse'):
+        instance = load_instance(problem)
+    with timer.phase('preprocess'):
+        reduced = reduce_instance(instance)
+        certificate = precheck_unsat(instance, reduced)
+    if certificate:
+        return unsat_result(timer, certificate)
+    with timer.phase('build'):
+        solver, assignments, steps_count, users_count = build_z3_model(reduced.instance, options.at_most_k)
+    options.configure_z3(solver)
+
+    with Spinner("Solving...", spinner='dots'):
         starttime = int(currenttime() * 1000)
-        check_status = solver.check()
+        # z3 has no separate presolve; its simplification is part of check()
+        with timer.phase('search'):
+            check_status = solver.check()
         endtime = int(currenttime() * 1000)
 
     d = {
         'sat': 'unsat',
         'sol': [],
-        'exe_time': f"{endtime - starttime}ms"
+        'exe_time': f"{endtime - starttime}ms",
+        'timings': timer.timings
     }
 
     if check_status == sat:
         d['sat'] = 'sat'
         model = solver.model()
-        solution = [f"s{i+1}: u{model[assignments[i]].as_long()}" for i in range(steps_count)]
-        d['sol'] = solution
+        values = reduced.expand([model[assignments[i]].as_long() for i in range(steps_count)])
+        d['sol'] = [f"s{i+1}: u{user}" for i, user in enumerate(values)]
+    elif check_status == unknown:
+        d['sat'] = 'unknown'
 
-    print("Solver status:", "sat" if check_status == sat else "unsat")
+    log(f"Solver status: {check_status}")
     return d
 
 
-def solve_multi_solution(filename):
-    """Solve the model in multi-solution mode, collecting up to 10 solutions with a 4,000,000 ms timeout."""
-    solver, assignments, steps_count, users_count = build_z3_model(filename)
-
-    # Set a timeout of 4,000,000 ms for multi-solution mode
-    solver.set(timeout=4000000)
+class SolutionEnumerator:
+    """Stream the distinct solutions of a built z3 model, one incremental check() per solution.
+
+    Solutions are projected on `assignments` (the reduced step classes) and mapped through `expand`.
+    Each blocking clause is guarded by one assumption literal, so the solver keeps its learned
+    clauses between checks and is left unchanged once enumeration stops (checks without the
+    literal ignore the blocking clauses). With `min_distance` > 1 every later solution differs on
+    steps of total `weights` at least `min_distance`. `time_limit` (seconds) is shared by all
+    checks; `status` is unsat once every solution was produced and unknown after a timeout.
+    """
+
+    def __init__(self, solver, assignments, expand=list, time_limit=None, timer=None, min_distance=1, weights=None):
+        self._solver = solver
+        self._min_distance = min_distance
+        self._weights = weights or [1] * len(assignments)
+        self._assignments = assignments
+        self._expand = expand
+        self._timer = timer or PhaseTimer()
+        self._deadline = None if time_limit is None else currenttime() + time_limit
+        self._blocking = Bool('enumeration_blocking')
+        self.status = unknown
+        self.count = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._deadline is not None:
+            remaining = int((self._deadline - currenttime()) * 1000)
+            if remaining <= 0:
+                self.status = unknown
+                raise StopIteration
+            self._solver.set(timeout=remaining)
+        with self._timer.phase('search'):
+            self.status = self._solver.check(self._blocking)
+        if self.status != sat:
+            if self.status == unknown:
+                log("Solver returned unknown (likely timeout). Returning partial solutions.")
+            raise StopIteration
+        model = self._solver.model()
+        values = [model.eval(assignment, model_completion=True) for assignment in self._assignments]
+        # Force at least one step class (or classes of min_distance steps) onto other users
+        if self._min_distance > 1:
+            differ = Sum([If(a != v, w, 0) for a, v, w in zip(self._assignments, values, self._weights)])
+            self._solver.add(Implies(self._blocking, differ >= self._min_distance))
+        else:
+            self._solver.add(Implies(self._blocking, Or([a != v for a, v in zip(self._assignments, values)])))
+        self.count += 1
+        return self._expand([v.as_long() for v in values])
+
+
+def solve_multi_solution(problem, validator=None, max_solutions=10, time_limit=None, min_distance=1, options=None):
+    """Solve the model in multi-solution mode, collecting up to `max_solutions` solutions
+    within `time_limit` seconds (default 4,000,000 ms), any two of which differ on at least
+    `min_distance` steps. `options` is a SolverOptions; `time_limit` overrides its time limit."""
+    options = SolverOptions.resolve(options, time_limit, MULTI_SOLUTION_TIME_LIMIT)
+    timer = PhaseTimer()
+    with timer.phase('parse'):
+        instance = load_instance(problem)
+    validator = validator or WorkflowValidator(instance)
+    with timer.phase('preprocess'):
+        reduced = reduce_instance(instance)
+        certificate = precheck_unsat(instance, reduced)
+    if certificate:
+        return unsat_result(timer, certificate, multi=True)
+    with timer.phase('build'):
+        solver, assignments, steps_count, users_count = build_z3_model(reduced.instance, options.at_most_k)
+    options.configure_z3(solver)
 
     solutions_found = []
-    solution_count = 0
+    enumeration = SolutionEnumerator(solver, assignments, reduced.expand, options.time_limit, timer, min_distance,
+                                     reduced.instance.step_weights)
 
-    # We'll iterate up to 10 solutions
-    with Halo("Solving (Multi-Solution Mode)...", spinner='dots') as h:
+    with Spinner("Solving (Multi-Solution Mode)...", spinner='dots') as h:
         starttime = int(currenttime() * 1000)
-        
-        while solution_count < 10:
-            status = solver.check()
-            if status == sat:
-                model = solver.model()
-                solution = [f"s{i+1}: u{model[assignments[i]].as_long()}" for i in range(steps_count)]
-                # Validate the solution
-                if validate_solution(filename, solution):
-                    solution_count += 1
-                    # Show that a new solution is found
-                    with Halo(text=f"Solution {solution_count} found!", spinner='dots') as spinner:
-                        spinner.succeed()
-                    solutions_found.append(solution)
-
-                # Add a constraint to exclude the current solution for the next iteration
-                # Force at least one step assignment to differ
-                exclude = []
-                for i in range(steps_count):
-                    exclude.append(assignments[i] != model[assignments[i]])
-                solver.add(Or(exclude))
-
-            elif status == unknown:
-                # Timeout or other issue
-                print("Solver returned unknown (likely timeout). Returning partial solutions.")
-                break
+        for values in enumeration:
+            solution = [f"s{i+1}: u{user}" for i, user in enumerate(values)]
+            # Validate the solution against the validator built once for this instance
+            with timer.phase('validation'):
+                is_valid, errors = validator.validate(values)
+            if is_valid:
+                solutions_found.append(solution)
+                # Show that a new solution is found
+                with Spinner(text=f"Solution {len(solutions_found)} found!", spinner='dots') as spinner:
+                    spinner.succeed()
+                if len(solutions_found) == max_solutions:
+                    break
             else:
-                # unsat: no more solutions
-                break
-
+                print("\nSolution Validation Errors:")
+                for error in errors:
+                    print(f"- {error}")
+        status = enumeration.status
         endtime = int(currenttime() * 1000)
 
+    if solutions_found:
+        sat_status = 'sat'
+    else:
+        sat_status = 'unknown' if status == unknown else 'unsat'
     d = {
-        'sat': 'unsat' if len(solutions_found) == 0 else 'sat',
+        'sat': sat_status,
         'mul_sol': solutions_found,
-        'exe_time': f"{endtime - starttime}ms"
+        'exe_time': f"{endtime - starttime}ms",
+        'timings': timer.timings
     }
 
     return d
 
 
 if __name__ == '__main__':
-    base_path = os.path.dirname(__file__)
-    instances_path = os.path.join(base_path, 'instances')
-    output_base_path = os.path.join(base_path, 'output_z3')
-
-    # Prompt user for mode selection
-    mode = input("Select mode: (S)ingle Solution or (M)ultiple Solutions? ").strip().lower()
-  
-
-    root = tk.Tk()
-    root.withdraw()
-    
-    root.attributes('-topmost', True)
-    root.focus_force()
-
-    spinner = Halo(text="Waiting for file selection", spinner="dots")
-    spinner.start()
-
-    try:
-        # File selection dialog
-        dpath = filedialog.askopenfilename(initialdir=instances_path, title="Select file")
-        if dpath:
-            spinner.succeed(f"File selected: {dpath}")
-            folder_name = os.path.basename(os.path.dirname(dpath))
-            file_name = os.path.basename(dpath)
-
-            # Check if the selected file is an example file
-            if file_name.startswith("example"):
-                folder_name = "examples"
-
-            file_prefix = os.path.splitext(file_name)[0]
-            solution_output_dir = os.path.join(output_base_path, folder_name)
-
-            if mode == 'm':
-                # Multi-solution mode
-                solution_output_file = f"multisolution{file_prefix}.txt"
-                d = solve_multi_solution(dpath)
-                if d['sat'] == 'sat':
-                    # Multiple solutions found
-                    all_solutions_output = [d['sat']]
-                    sol_index = 1
-                    for sol in d['mul_sol']:
-                        all_solutions_output.append(f"Solution {sol_index}:")
-                        all_solutions_output.extend(sol)
-                        sol_index += 1
-                    all_solutions_output.append(f"Time Elapsed: {d['exe_time']}")
-
-                    save_solution(solution_output_dir, solution_output_file, all_solutions_output)
-                    print("\nAll Solutions:")
-                    print("\n".join(all_solutions_output))
-                else:
-                    # No solution found
-                    solution_output = [d['sat'], f"Time Elapsed: {d['exe_time']}"]
-                    save_solution(solution_output_dir, solution_output_file, solution_output)
-                    print("\nNo solutions found.")
-                    print("\n".join(solution_output))
-
-            else:
-                # Single solution mode
-                solution_output_file = f"solution{file_prefix}.txt"
-                d = solve_single_solution(dpath)
-                if d['sat'] == 'sat':
-                    solution_output = [d['sat']] + d['sol'] + [f"Time Elapsed: {d['exe_time']}"]
-                    # Validate the solution before saving or printing
-                    if validate_solution(dpath, d['sol']):
-                        save_solution(solution_output_dir, solution_output_file, solution_output)
-                        print("\nSolution:")
-                        print("\n".join(solution_output))
-                    else:
-                        print("\nSolution validation failed. Not saving.")
-                        print("\nSolution:")
-                        print("\n".join([d['sat']] + d['sol']))
-                        print(f"\nTime Elapsed :{d['exe_time']}")
-                else:
-                    solution_output = [d['sat']] + d['sol'] + [f"Time Elapsed: {d['exe_time']}"]
-                    save_solution(solution_output_dir, solution_output_file, solution_output)
-                    print("\nSolution:")
-                    print(d['sat'])
-                    print(f"\nTime Elapsed :{d['exe_time']}")
-        else:
-            spinner.fail("No file selected. Exiting.")
-    except Exception as e:
-        spinner.fail(f"Error occurred: {e}")
+    run_solver_gui('output_z3', solve_single_solution, solve_multi_solution)
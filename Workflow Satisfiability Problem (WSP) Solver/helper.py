@@ -6,6 +6,12 @@ Automatically generated by Colaboratory.
 Original file is located at
     https://colab.research.google.com/drive/1e10fS9x-i18xCkazCskL6ekXNWHnmNRo
 """
+import os
+import re
+from contextlib import contextmanager
+from dataclasses import dataclass, field, replace
+from time import perf_counter
+from typing import Callable, Optional
 
 def transform_output(d):
     crlf = '\r\n'
@@ -13,4 +19,339 @@ def transform_output(d):
     s = ''.join(kk + crlf for kk in d['sol'])
     s=d['sat']+crlf+s+d['mul_sol']
     s=crlf+ s + crlf+str(d['exe_time']) if 'exe_time' in d else s
-    return s
\ No newline at end of file
+    return s
+
+
+# Console output settings shared by the solvers; the command line turns both off
+_output_settings = {'verbose': True, 'spinners': True}
+
+
+def configure_output(verbose=True, spinners=True):
+    """Enable or silence model-building messages and Halo spinners."""
+    _output_settings['verbose'] = verbose
+    _output_settings['spinners'] = spinners
+
+
+def log(message):
+    """Print a progress message unless output has been silenced."""
+    if _output_settings['verbose']:
+        print(message)
+
+
+class _SilentSpinner:
+    """Stand-in for Halo when spinners are disabled or halo is not installed."""
+
+    def __init__(self, text=""):
+        self.text = text
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def start(self, text=None):
+        return self
+
+    def stop(self):
+        return self
+
+    def succeed(self, text=None):
+        return self
+
+    def fail(self, text=None):
+        return self
+
+
+def Spinner(text="", spinner="dots"):
+    """Return a Halo spinner for interactive runs, or a silent one when spinners are off."""
+    if not _output_settings['spinners']:
+        return _SilentSpinner(text)
+    from halo import Halo
+    return Halo(text=text, spinner=spinner)
+
+
+# Phases reported in a result's 'timings' dict, all in milliseconds
+PHASES = ('parse', 'preprocess', 'build', 'presolve', 'search', 'validation', 'write')
+
+
+class PhaseTimer:
+    """Accumulates wall-clock milliseconds per phase for a solver result."""
+
+    def __init__(self):
+        self.timings = {phase: 0.0 for phase in PHASES}
+
+    @contextmanager
+    def phase(self, name):
+        starttime = perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] += (perf_counter() - starttime) * 1000
+
+    def split_solve(self, solve_ms, presolve_seconds, validation_ms=None):
+        """Split a CP-SAT solve call into presolve and search.
+
+        `presolve_seconds` is None when the solver never started searching (the model was
+        decided during presolve). Validation recorded inside the call (`validation_ms`, by default
+        all validation so far) is not search.
+        """
+        if validation_ms is None:
+            validation_ms = self.timings['validation']
+        presolve_ms = solve_ms if presolve_seconds is None else min(solve_ms, presolve_seconds * 1000)
+        self.timings['presolve'] += presolve_ms
+        self.timings['search'] += max(0.0, solve_ms - presolve_ms - validation_ms)
+
+
+def unsat_result(timer, certificate, multi=False):
+    """Result dict for an instance proved unsat before any solver ran (see wsp_prechecks).
+    Its exe_time is the time spent so far, i.e. on the phases that proved it."""
+    log(f"Unsat before solving: {certificate}")
+    return {
+        'sat': 'unsat',
+        'sol': [],
+        'mul_sol': [] if multi else '',
+        'exe_time': f"{int(sum(timer.timings.values()))}ms",
+        'timings': timer.timings,
+        'unsat_reason': str(certificate),
+        'unsat_certificate': certificate.to_dict(),
+    }
+
+
+def track_presolve(solver, log_callback=None):
+    """Route a CP-SAT solver's log into memory and return a function giving the presolve time
+    (seconds) of its last solve, read from the "Starting search at ..." log line (10ms resolution).
+    Every log line is also passed on to `log_callback`, if given."""
+    search_starts = []
+
+    def on_log(line):
+        if log_callback:
+            log_callback(line)
+        if line.startswith('Starting CP-SAT'):
+            search_starts.clear()
+        match = re.match(r'Starting search at ([\d.]+)s', line)
+        if match:
+            search_starts.append(float(match.group(1)))
+
+    solver.parameters.log_search_progress = True
+    solver.parameters.log_to_stdout = False
+    solver.log_callback = on_log
+    return lambda: search_starts[-1] if search_starts else None
+
+
+# Time limit (seconds) of multi-solution mode when none is given
+MULTI_SOLUTION_TIME_LIMIT = 4000
+
+# At-most-k encodings of the OR-Tools integer and z3 models: 'slots' gives every group k user
+# variables that each step must match, 'used' one "takes a step of the group" flag per
+# authorised user, at most k of which may be set (the Doreen model always works this way).
+# z3 names its default in AT_MOST_K_ENCODING; the OR-Tools model picks one per group.
+AT_MOST_K_ENCODINGS = ('slots', 'used')
+
+
+@dataclass
+class SolverOptions:
+    """Search settings accepted by every solve function.
+
+    `workers` defaults to all cores. `seed`, `symmetry_level` and `linearization_level` are CP-SAT
+    parameters and None keeps CP-SAT's default; z3 only uses `time_limit` and `seed`, and the
+    pattern search only `time_limit`. `log_callback` receives CP-SAT's search log line by line.
+    `at_most_k` picks the model encoding of At-most-k (see AT_MOST_K_ENCODINGS); None keeps the
+    backend's default. `split_presolve` turns CP-SAT's search log on to time presolve apart from
+    search (see track_presolve); it costs a few percent, so by default the whole solve call
+    counts as search unless a `log_callback` has the log switched on anyway.
+    """
+    workers: int = field(default_factory=lambda: os.cpu_count() or 1)
+    time_limit: Optional[float] = None  # seconds
+    seed: Optional[int] = None
+    log_callback: Optional[Callable[[str], None]] = None
+    symmetry_level: Optional[int] = None
+    linearization_level: Optional[int] = None
+    at_most_k: Optional[str] = None
+    split_presolve: bool = False
+
+    @classmethod
+    def resolve(cls, options=None, time_limit=None, default_time_limit=None):
+        """The options a solve function runs with: an explicit `time_limit` argument wins over
+        `options.time_limit`, which wins over `default_time_limit`."""
+        options = options or cls()
+        time_limit = time_limit if time_limit is not None else options.time_limit
+        return replace(options, time_limit=time_limit if time_limit is not None else default_time_limit)
+
+    def configure_cp_sat(self, solver, enumerate_all=False):
+        """Apply the options to a CpSolver and return its presolve-time reader (see track_presolve),
+        which reads 0 when the presolve split is off.
+
+        Enumerating all solutions runs on one worker: more workers would report the same
+        solutions several times.
+        """
+        parameters = solver.parameters
+        parameters.cp_model_presolve = True
+        parameters.num_workers = 1 if enumerate_all else self.workers
+        if self.time_limit is not None:
+            parameters.max_time_in_seconds = self.time_limit
+        if self.seed is not None:
+            parameters.random_seed = self.seed
+        if self.symmetry_level is not None:
+            parameters.symmetry_level = self.symmetry_level
+        if self.linearization_level is not None:
+            parameters.linearization_level = self.linearization_level
+        if not (self.split_presolve or self.log_callback):
+            return lambda: 0.0
+        return track_presolve(solver, self.log_callback)
+
+    def configure_z3(self, solver):
+        """Apply the time limit and seed to a z3 Solver."""
+        if self.time_limit is not None:
+            solver.set(timeout=int(self.time_limit * 1000))
+        if self.seed is not None:
+            solver.set(random_seed=self.seed)
+
+
+def solve_diverse(solver, model, collector, exclude, max_solutions, time_limit, timer, presolve_time):
+    """Collect up to `max_solutions` solutions with repeated CP-SAT Solve() calls sharing
+    `time_limit` seconds, instead of SearchForAllSolutions (which turns presolve off and walks
+    through neighbouring solutions one at a time).
+
+    Every Solve() reports its solution to `collector` (a MultiSolutionCollector); `exclude(key)`
+    then adds the constraints that keep the next solutions away from it. Returns the status
+    of the last Solve() call.
+    """
+    deadline = perf_counter() + time_limit
+    while True:
+        solver.parameters.max_time_in_seconds = max(0.0, deadline - perf_counter())
+        validation_before = timer.timings['validation']
+        status = solver.Solve(model, collector)
+        timer.split_solve(solver.WallTime() * 1000, presolve_time(), timer.timings['validation'] - validation_before)
+        if solver.StatusName(status) not in ('OPTIMAL', 'FEASIBLE'):
+            break
+        exclude(collector.last_key)
+        if len(collector.get_assignments()) >= max_solutions or perf_counter() >= deadline:
+            break
+    return status
+
+
+def save_solution(output_dir, file_name, solution_data):
+    os.makedirs(output_dir, exist_ok=True)
+    output_path = os.path.join(output_dir, file_name)
+    with open(output_path, 'w') as file:
+        file.write("\n".join(solution_data))
+    log(f"Solution saved to {output_path}")
+    return output_path
+
+
+def solution_output_location(output_base_path, problem_path, multi=False):
+    """Return (directory, file name) of the solution file for an instance, e.g.
+    output_ortools/4-constraint/solution3.txt or output_ortools/examples/multisolutionexample1.txt."""
+    folder_name = os.path.basename(os.path.dirname(problem_path))
+    file_name = os.path.basename(problem_path)
+    if file_name.startswith("example"):
+        folder_name = "examples"
+    file_prefix = os.path.splitext(file_name)[0]
+    prefix = "multisolution" if multi else "solution"
+    return os.path.join(output_base_path, folder_name), f"{prefix}{file_prefix}.txt"
+
+
+def format_solution_output(d, multi=False):
+    """Lines of a solution file for a solver result dict."""
+    lines = [d['sat']]
+    if multi:
+        if d['sat'] == 'sat':
+            for sol_index, sol in enumerate(d['mul_sol'], start=1):
+                lines.append(f"Solution {sol_index}:")
+                lines.extend(sol)
+    else:
+        lines.extend(d['sol'])
+    lines.append(f"Time Elapsed: {d['exe_time']}")
+    return lines
+
+
+def validate_solution(validator, solution):
+    """Run ValidatorPro on the solution before saving or displaying.
+
+    `validator` is a WorkflowValidator built once for the instance being solved."""
+    # Transform solution into a dictionary
+    solution_dict = {}
+    for line in solution:
+        step, user = line.split(': ')
+        solution_dict[int(step[1:])] = int(user[1:])
+
+    spinner = Spinner(text="Validating solution", spinner="dots")
+    spinner.start()
+
+    try:
+        is_valid, errors = validator.validate_solution(solution_dict)
+        if is_valid:
+            spinner.succeed("Validation successful!")
+            return True
+        else:
+            spinner.fail("Validation failed.")
+            print("\nSolution Validation Errors:")
+            for error in errors:
+                print(f"- {error}")
+            return False
+    except Exception as e:
+        spinner.fail(f"Validation error: {e}")
+        return False
+
+
+def run_solver_gui(output_folder, solve_single, solve_multi):
+    """Interactive entry point of the solver modules: ask for the mode, pick an instance file in a
+    tkinter dialog, solve it with `solve_single` or `solve_multi` and save the validated result
+    under `output_folder` (e.g. 'output_ortools')."""
+    import tkinter as tk
+    from tkinter import filedialog
+    from ValidatorPro import WorkflowValidator
+    from wsp_instance import load_instance
+
+    base_path = os.path.dirname(__file__)
+    instances_path = os.path.join(base_path, 'instances')
+    output_base_path = os.path.join(base_path, output_folder)
+
+    # Prompt user for mode selection
+    mode = input("Select mode: (S)ingle Solution or (M)ultiple Solutions? ").strip().lower()
+
+    root = tk.Tk()
+    root.withdraw()
+
+    root.attributes('-topmost', True)
+    root.focus_force()
+
+    spinner = Spinner(text="Waiting for file selection", spinner="dots")
+    spinner.start()
+
+    try:
+        # File selection dialog
+        dpath = filedialog.askopenfilename(initialdir=instances_path, title="Select file")
+        if dpath:
+            spinner.succeed(f"File selected: {dpath}")
+            solution_output_dir, solution_output_file = solution_output_location(output_base_path, dpath, multi=(mode == 'm'))
+            instance = load_instance(dpath)
+            validator = WorkflowValidator(instance)
+
+            if mode == 'm':
+                # Multi-solution mode
+                d = solve_multi(instance, validator)
+                all_solutions_output = format_solution_output(d, multi=True)
+                save_solution(solution_output_dir, solution_output_file, all_solutions_output)
+                print("\nAll Solutions:" if d['sat'] == 'sat' else "\nNo solutions found.")
+                print("\n".join(all_solutions_output))
+
+            else:
+                # Single solution mode
+                d = solve_single(instance)
+                solution_output = format_solution_output(d)
+                # Validate before saving
+                if d['sat'] == 'sat' and not validate_solution(validator, d['sol']):
+                    print("\nSolution validation failed. Not saving.")
+                    print("\nSolution:")
+                    print("\n".join([d['sat']] + d['sol']))
+                    print(f"\nTime Elapsed :{d['exe_time']}")
+                else:
+                    save_solution(solution_output_dir, solution_output_file, solution_output)
+                    print("\nSolution:")
+                    print("\n".join(solution_output))
+        else:
+            spinner.fail("No file selected. Exiting.")
+    except Exception as e:
+        spinner.fail(f"Error occurred: {e}")
@@ -0,0 +1,89 @@
+import argparse
+import os
+import re
+import sys
+from collections import defaultdict
+from time import time as currenttime
+
+from ValidatorPro import WorkflowValidator, get_relative_path
+from wsp_instance import parse_instance
+
+OUTPUT_FOLDERS = ["output_ortools", "output_z3", "output_doreen", "output_pattern"]
+
+
+def instance_path_for(solution_path: str) -> str:
+    """Map output_<solver>/<folder>/[multi]solution<name>.txt back to its instance file."""
+    folder = os.path.basename(os.path.dirname(solution_path))
+    name = re.sub(r'^(multi)?solution', '', os.path.basename(solution_path))
+    if folder == "examples":
+        return get_relative_path(os.path.join("instances", name))
+    return get_relative_path(os.path.join("instances", folder, name))
+
+
+def collect_solution_files(output_folders):
+    """Group every solution file under the output folders by the instance it solves."""
+    by_instance = defaultdict(list)
+    for output_folder in output_folders:
+        root = get_relative_path(output_folder)
+        for dirpath, _, filenames in os.walk(root):
+            for filename in sorted(filenames):
+                if re.match(r'^(multi)?solution.*\.txt$', filename):
+                    solution_path = os.path.join(dirpath, filename)
+                    by_instance[instance_path_for(solution_path)].append(solution_path)
+    return by_instance
+
+
+def validate_outputs(output_folders):
+    """Re-validate every solution in the output folders, one batch per instance.
+
+    Returns (solutions checked, invalid solutions, unsat files, violation totals per constraint type).
+    """
+    checked = invalid = unsat_files = 0
+    totals = defaultdict(int)
+
+    for problem_path, solution_paths in sorted(collect_solution_files(output_folders).items()):
+        if not os.path.exists(problem_path):
+            print(f"Missing instance {problem_path} for {len(solution_paths)} solution file(s)")
+            continue
+        validator = WorkflowValidator(parse_instance(problem_path))
+
+        batch, owners = [], []
+        for solution_path in solution_paths:
+            solutions, is_unsat = validator.parse_solutions(solution_path)
+            unsat_files += is_unsat
+            batch.extend(solutions)
+            owners.extend([solution_path] * len(solutions))
+        if not batch:
+            continue
+
+        valid, counts = validator.validate_batch(batch)
+        checked += len(batch)
+        for kind, per_solution in counts.items():
+            totals[kind] += int(per_solution.sum())
+        for index in (~valid).nonzero()[0]:
+            invalid += 1
+            kinds = ", ".join(f"{kind}={int(per_solution[index])}" for kind, per_solution in counts.items()
+                              if per_solution[index])
+            print(f"INVALID {owners[index]}: {kinds}")
+
+    return checked, invalid, unsat_files, dict(totals)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-validate all solver output files against their instances.")
+    parser.add_argument("folders", nargs="*", default=OUTPUT_FOLDERS,
+                        help="output folders to check (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    starttime = currenttime()
+    checked, invalid, unsat_files, totals = validate_outputs(args.folders)
+    elapsed = currenttime() - starttime
+
+    print(f"Checked {checked} solutions ({unsat_files} unsat files) in {elapsed:.2f}s: {invalid} invalid")
+    for kind, total in totals.items():
+        print(f"- {kind}: {total} violations")
+    return 1 if invalid else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
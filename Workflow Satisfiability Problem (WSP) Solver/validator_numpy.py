@@ -0,0 +1,123 @@
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from wsp_instance import WSPInstance
+
+
+class NumpyValidationEngine:
+    """Array based validation engine for WorkflowValidator.
+
+    Assignments are int arrays of 1-based users, one column per step. Every check is
+    written for a 2-D (solutions x steps) array so single solutions and batches share
+    the same code path.
+    """
+
+    def __init__(self, instance: WSPInstance):
+        self.instance = instance
+        self.steps_count = instance.steps_count
+        self.users_count = instance.users_count
+
+        # Authorisations as a users x steps boolean matrix; users without a line may do any step
+        self.allowed = np.ones((instance.users_count, instance.steps_count), dtype=bool)
+        for user, steps in instance.authorisations.items():
+            self.allowed[user] = False
+            self.allowed[user, steps] = True
+
+        self.sod = np.array(instance.separation_of_duty, dtype=np.intp).reshape(-1, 2)
+        self.bod = np.array(instance.binding_of_duty, dtype=np.intp).reshape(-1, 2)
+
+        # At-most-k groups padded with their own first step, which never adds a distinct user
+        width = max((len(steps) for _, steps in instance.at_most_k), default=1)
+        self.at_most_k_limits = np.array([k for k, _ in instance.at_most_k], dtype=np.intp)
+        self.at_most_k_steps = np.array([steps + [steps[0]] * (width - len(steps))
+                                         for _, steps in instance.at_most_k], dtype=np.intp).reshape(-1, width)
+
+        # One-team constraints as (steps, teams x users membership matrix)
+        self.one_team = []
+        for steps, teams in instance.one_team:
+            members = np.zeros((len(teams), instance.users_count), dtype=bool)
+            for t_idx, team in enumerate(teams):
+                members[t_idx, [u for u in team if u < instance.users_count]] = True
+            self.one_team.append((np.array(steps, dtype=np.intp), members))
+
+        self.capacities = np.array(instance.capacities, dtype=np.intp)
+
+    def violations(self, assignments: np.ndarray) -> Dict[str, np.ndarray]:
+        """Boolean violation matrices for a (solutions x steps) array of 1-based users."""
+        users = np.asarray(assignments, dtype=np.intp) - 1
+        solutions = users.shape[0]
+        in_range = (users >= 0) & (users < self.users_count)
+        safe = np.where(in_range, users, 0)
+
+        authorisation = ~in_range | ~self.allowed[safe, np.arange(self.steps_count)]
+        separation = users[:, self.sod[:, 0]] == users[:, self.sod[:, 1]]
+        binding = users[:, self.bod[:, 0]] != users[:, self.bod[:, 1]]
+
+        # Distinct users per group: sort each group and count value changes
+        group_users = np.sort(users[:, self.at_most_k_steps], axis=-1)
+        distinct = 1 + np.count_nonzero(np.diff(group_users, axis=-1), axis=-1)
+        at_most_k = distinct > self.at_most_k_limits
+
+        one_team = np.zeros((solutions, len(self.one_team)), dtype=bool)
+        for c_idx, (steps, members) in enumerate(self.one_team):
+            step_users = safe[:, steps]
+            # members[:, step_users] is teams x solutions x steps
+            fits = (members[:, step_users] & in_range[:, steps]).all(axis=-1)
+            one_team[:, c_idx] = ~fits.any(axis=0)
+
+        offsets = np.arange(solutions, dtype=np.intp)[:, None] * self.users_count
+        counts = np.bincount((safe + offsets)[in_range], minlength=solutions * self.users_count)
+        counts = counts.reshape(solutions, self.users_count)
+        capacity = counts > self.capacities
+
+        return {
+            'authorisation': authorisation,
+            'separation_of_duty': separation,
+            'binding_of_duty': binding,
+            'at_most_k': at_most_k,
+            'one_team': one_team,
+            'capacity': capacity,
+            'counts': counts,
+        }
+
+    def validate_batch(self, assignments: np.ndarray) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """Validate a (solutions x steps) array in one pass.
+
+        Returns a per-solution validity vector and, for every constraint type, the number
+        of violated constraints of that type in each solution.
+        """
+        found = self.violations(np.asarray(assignments, dtype=np.intp).reshape(-1, self.steps_count))
+        found.pop('counts')
+        counts = {kind: matrix.sum(axis=1) for kind, matrix in found.items()}
+        valid = ~np.any([c > 0 for c in counts.values()], axis=0)
+        return valid, counts
+
+    def validate(self, assignment: Sequence[int]) -> Tuple[bool, List[str]]:
+        """Validate one complete assignment, reporting errors like the pure Python engine."""
+        users = np.asarray(assignment, dtype=np.intp).reshape(1, -1)
+        found = self.violations(users)
+        instance = self.instance
+        errors = []
+
+        for step in np.flatnonzero(found['authorisation'][0]):
+            errors.append(f"Authorization violation: User u{users[0, step]} is not authorized for step s{step + 1}.")
+        for idx in np.flatnonzero(found['separation_of_duty'][0]):
+            step1, step2 = instance.separation_of_duty[idx]
+            errors.append(f"Separation-of-duty violation: Steps s{step1 + 1} and s{step2 + 1} assigned to the same user.")
+        for idx in np.flatnonzero(found['binding_of_duty'][0]):
+            step1, step2 = instance.binding_of_duty[idx]
+            errors.append(f"Binding-of-duty violation: Steps s{step1 + 1} and s{step2 + 1} assigned to different users.")
+        for idx in np.flatnonzero(found['at_most_k'][0]):
+            k, steps = instance.at_most_k[idx]
+            errors.append(f"At-most-{k} violation: More than {k} users assigned to steps {[s + 1 for s in steps]}.")
+        for idx in np.flatnonzero(found['one_team'][0]):
+            steps, teams = instance.one_team[idx]
+            errors.append(f"One-team violated: Steps {[s + 1 for s in steps]} assigned users "
+                          f"{[int(users[0, s]) for s in steps]} do not match any valid team "
+                          f"{[[u + 1 for u in team] for team in teams]}.")
+        for user in np.flatnonzero(found['capacity'][0]):
+            errors.append(f"User-Capacity violation: User u{user + 1} assigned to {found['counts'][0, user]} steps, "
+                          f"exceeding capacity {self.capacities[user]}.")
+
+        return len(errors) == 0, errors
@@ -0,0 +1,238 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+from queue import Empty
+from time import perf_counter
+
+from helper import configure_output, PHASES, SolverOptions
+from wsp_cli import expand_instance_paths, add_solver_arguments, solver_options
+from wsp_runner import BACKENDS, default_output_dir, solve_instance, write_result
+
+BASE_PATH = os.path.dirname(os.path.abspath(__file__))
+
+# Seconds a worker gets beyond `time_limit` for parsing, building and writing before it is killed
+WALL_LIMIT_GRACE = 30
+
+# Everything the nightly run solves
+DEFAULT_INSTANCES = [
+    os.path.join(BASE_PATH, 'instances', '3-constraint'),
+    os.path.join(BASE_PATH, 'instances', '4-constraint'),
+    os.path.join(BASE_PATH, 'instances', '5-constraint'),
+    os.path.join(BASE_PATH, 'instances', '4-constraint-hard'),
+    os.path.join(BASE_PATH, 'instances', 'example*.txt'),
+]
+
+
+def _init_worker():
+    # Workers share the terminal, so keep their output quiet
+    configure_output(verbose=False, spinners=False)
+
+
+def _worker_loop(tasks, results):
+    _init_worker()
+    for args in iter(tasks.get, None):
+        results.put(solve_and_write(*args))
+
+
+class _Worker:
+    """A worker process with its own task queue, so the instance it is on is known and the
+    process can be killed and replaced when that instance overruns."""
+
+    def __init__(self, context, results):
+        self.tasks = context.Queue()
+        self.process = context.Process(target=_worker_loop, args=(self.tasks, results))
+        self.process.start()
+        self.path = None
+        self.starttime = None
+
+    def submit(self, args):
+        self.path, self.starttime = args[0], perf_counter()
+        self.tasks.put(args)
+
+    def stop(self, kill=False):
+        if kill:
+            self.process.terminate()
+        else:
+            self.tasks.put(None)
+        self.process.join()
+
+
+def _failed_row(problem_path, status, latency, error):
+    return {
+        'instance': problem_path,
+        'status': status,
+        'valid': True,
+        'latency': latency,
+        'timings': {phase: 0.0 for phase in PHASES},
+        'winner': None,
+        'output': None,
+        'error': error,
+    }
+
+
+def solve_and_write(problem_path, backend, mode, max_solutions, time_limit, output_dir, output_format, min_distance=1,
+                    options=None):
+    """Worker task: solve one instance, write its result file and return a summary row."""
+    starttime = perf_counter()
+    try:
+        d = solve_instance(problem_path, backend, mode, max_solutions, time_limit, min_distance, options)
+        output_path = write_result(d, output_dir, output_format)
+        status, valid, error, timings = d['sat'], d['valid'], None, d['timings']
+        winner = d.get('winner')
+    except Exception as e:
+        output_path, status, valid, error = None, 'error', False, f"{type(e).__name__}: {e}"
+        timings = {phase: 0.0 for phase in PHASES}
+        winner = None
+    return {
+        'instance': problem_path,
+        'status': status,
+        'valid': valid,
+        'latency': perf_counter() - starttime,
+        'timings': timings,
+        'winner': winner,
+        'output': output_path,
+        'error': error,
+    }
+
+
+def run_batch(paths, backend='ortools', mode='single', workers=None, time_limit=None, max_solutions=10,
+              output_dir=None, output_format='text', on_result=None, min_distance=1, options=None, wall_limit=None):
+    """Solve `paths` on `workers` processes (default: all cores) and return (rows, wall time in seconds).
+
+    `time_limit` is handed to the solver of every instance, which reports 'unknown' when it
+    runs out. `wall_limit` (seconds, default `time_limit` + WALL_LIMIT_GRACE, none without a time
+    limit) bounds everything done for one instance: a worker still busy after it is killed and
+    replaced, and the instance is reported as 'timeout'; a worker that dies is reported as
+    'error'. `on_result` is called with each row as soon as its instance finishes. `options`
+    (a SolverOptions) defaults to one CP-SAT worker per process, since the pool already uses
+    every core.
+    """
+    options = options or SolverOptions(workers=1)
+    output_dir = output_dir or default_output_dir(backend)
+    if wall_limit is None and time_limit is not None:
+        wall_limit = time_limit + WALL_LIMIT_GRACE
+    pending = [(path, backend, mode, max_solutions, time_limit, output_dir, output_format, min_distance, options)
+               for path in reversed(paths)]
+    context = multiprocessing.get_context()
+    results = context.Queue()
+    pool = [_Worker(context, results) for _ in range(min(workers or os.cpu_count() or 1, len(paths)))]
+    rows = []
+
+    def finish(worker, row):
+        worker.path = None
+        rows.append(row)
+        if on_result:
+            on_result(row)
+
+    starttime = perf_counter()
+    try:
+        for worker in pool:
+            if pending:
+                worker.submit(pending.pop())
+        while len(rows) < len(paths):
+            try:
+                row = results.get(timeout=0.5)
+            except Empty:
+                for i, worker in enumerate(pool):
+                    if worker.path is None:
+                        continue
+                    latency = perf_counter() - worker.starttime
+                    if worker.process.exitcode is not None:
+                        error = f"worker exited with code {worker.process.exitcode}"
+                        status = 'error'
+                    elif wall_limit is not None and latency > wall_limit:
+                        error = f"killed after {wall_limit:g}s wall time"
+                        status = 'timeout'
+                    else:
+                        continue
+                    worker.stop(kill=True)
+                    finish(worker, _failed_row(worker.path, status, latency, error))
+                    pool[i] = worker = _Worker(context, results)
+                    if pending:
+                        worker.submit(pending.pop())
+                continue
+            worker = next((w for w in pool if w.path == row['instance']), None)
+            if worker is None:
+                continue  # Reported by a worker that was killed right after it finished
+            finish(worker, row)
+            if pending:
+                worker.submit(pending.pop())
+    finally:
+        for worker in pool:
+            worker.stop(kill=worker.path is not None)
+    return rows, perf_counter() - starttime
+
+
+def summarise(rows, wall):
+    """Aggregate numbers for a finished batch."""
+    latencies = sorted(row['latency'] for row in rows)
+    statuses, winners = {}, {}
+    for row in rows:
+        statuses[row['status']] = statuses.get(row['status'], 0) + 1
+        if row['winner']:
+            winners[row['winner']] = winners.get(row['winner'], 0) + 1
+    return {
+        'instances': len(rows),
+        'wall': wall,
+        'total_latency': sum(latencies),
+        'max_latency': latencies[-1] if latencies else 0.0,
+        'median_latency': latencies[len(latencies) // 2] if latencies else 0.0,
+        'statuses': statuses,
+        'winners': winners,
+        'phase_totals': {phase: sum(row['timings'][phase] for row in rows) for phase in PHASES},
+        'invalid': sum(not row['valid'] and row['status'] != 'error' for row in rows),
+        'errors': sum(row['status'] == 'error' for row in rows),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve many WSP instances in parallel.")
+    parser.add_argument("instances", nargs="*", default=DEFAULT_INSTANCES,
+                        help="instance files, directories or glob patterns (default: the whole instances/ tree)")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="ortools")
+    parser.add_argument("--mode", choices=["single", "multi"], default="single")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--time-limit", type=float, default=None, help="time limit per instance in seconds")
+    parser.add_argument("--wall-limit", type=float, default=None,
+                        help="seconds after which a worker is killed and its instance reported as timeout "
+                             f"(default: time limit + {WALL_LIMIT_GRACE})")
+    parser.add_argument("--solutions", type=int, default=10, help="solutions to collect in multi mode")
+    parser.add_argument("--min-distance", type=int, default=1,
+                        help="multi mode: minimum number of steps on which any two solutions differ")
+    parser.add_argument("--output-dir", default=None, help="output folder (default: output_<backend>)")
+    parser.add_argument("--format", choices=["text", "json"], default="text", dest="output_format")
+    add_solver_arguments(parser, default_workers=1)
+    parser.add_argument("--summary", default=None, help="write per-instance latencies and totals to this JSON file")
+    args = parser.parse_args(argv)
+
+    def report(row):
+        detail = row['error'] or ("" if row['valid'] else "INVALID")
+        if row['winner']:
+            detail = f"[{row['winner']}] {detail}"
+        print(f"{row['latency'] * 1000:9.0f}ms  {row['status']:<7} {row['instance']} {detail}".rstrip())
+
+    paths = expand_instance_paths(args.instances)
+    rows, wall = run_batch(paths, args.backend, args.mode, args.workers, args.time_limit, args.solutions,
+                           args.output_dir, args.output_format, on_result=report, min_distance=args.min_distance,
+                           options=solver_options(args), wall_limit=args.wall_limit)
+    summary = summarise(rows, wall)
+
+    print(f"\n{summary['instances']} instances in {wall:.2f}s wall "
+          f"({summary['total_latency']:.2f}s summed latency, median {summary['median_latency'] * 1000:.0f}ms, "
+          f"max {summary['max_latency'] * 1000:.0f}ms)")
+    print(", ".join(f"{status}: {count}" for status, count in sorted(summary['statuses'].items())))
+    if summary['winners']:
+        print("Won by: " + ", ".join(f"{backend}: {count}" for backend, count in sorted(summary['winners'].items())))
+    print("Time per phase: " + ", ".join(f"{phase} {ms / 1000:.2f}s" for phase, ms in summary['phase_totals'].items()))
+
+    if args.summary:
+        with open(args.summary, 'w') as file:
+            json.dump({'summary': summary, 'instances': sorted(rows, key=lambda row: row['instance'])}, file, indent=2)
+
+    return 1 if summary['invalid'] or summary['errors'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
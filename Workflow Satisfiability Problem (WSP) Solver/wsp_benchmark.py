@@ -0,0 +1,310 @@
+import argparse
+import importlib
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import statistics
+import sys
+from datetime import datetime
+from queue import Empty
+from time import perf_counter
+
+from helper import configure_output, SolverOptions
+from wsp_cli import expand_instance_paths, add_solver_arguments, solver_options
+from wsp_instance import parse_instance
+from wsp_preprocess import reduce_instance
+from wsp_prechecks import precheck_unsat
+
+BASE_PATH = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(BASE_PATH, 'benchmarks', 'baseline.json')
+BENCHMARK_BACKENDS = ['ortools', 'doreen', 'z3', 'pattern']
+# Seconds a run gets beyond its time limit (process start, imports, parse, build) before it is killed
+RUN_LIMIT_GRACE = 30
+
+# Quick suite: every bundled folder plus the examples that solve in seconds
+DEFAULT_SUITE = [
+    os.path.join('instances', '3-constraint'),
+    os.path.join('instances', '4-constraint'),
+    os.path.join('instances', '5-constraint'),
+    os.path.join('instances', 'example[1-9].txt'),
+    os.path.join('instances', 'example1[0-5].txt'),
+]
+
+
+# Imported before any timer starts so build times exclude module loading
+BACKEND_MODULES = {'ortools': 'WSP_Solver_ortools', 'doreen': 'WSP_Solver_Doreen', 'z3': 'WSP_Solver_z3',
+                   'pattern': 'WSP_Solver_pattern'}
+
+
+def _build_ortools(instance, options):
+    from WSP_Solver_ortools import build_model
+    return _cp_model_run(build_model(instance, options.at_most_k)[0])
+
+
+def _build_doreen(instance, options):
+    from WSP_Solver_Doreen import build_model
+    return _cp_model_run(build_model(instance)[0])
+
+
+def _cp_model_run(model):
+    proto = model.Proto()
+
+    def solve(options):
+        from ortools.sat.python import cp_model
+        solver = cp_model.CpSolver()
+        options.configure_cp_sat(solver)
+        status = solver.Solve(model)
+        if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            return 'sat'
+        return 'unsat' if status == cp_model.INFEASIBLE else 'unknown'
+
+    return solve, lambda: (len(proto.variables), len(proto.constraints))
+
+
+def _build_z3(instance, options):
+    from z3 import sat, unsat
+    from z3.z3util import get_vars
+    from WSP_Solver_z3 import build_z3_model
+    solver = build_z3_model(instance, options.at_most_k)[0]
+
+    def model_size():
+        assertions = solver.assertions()
+        variables = set()
+        for assertion in assertions:
+            variables.update(str(v) for v in get_vars(assertion))
+        return len(variables), len(assertions)
+
+    def solve(options):
+        options.configure_z3(solver)
+        status = solver.check()
+        return 'sat' if status == sat else 'unsat' if status == unsat else 'unknown'
+
+    return solve, model_size
+
+
+def _build_pattern(instance, options):
+    from WSP_Solver_pattern import PatternSearch, SearchTimeout
+
+    def solve(options):
+        deadline = None if options.time_limit is None else perf_counter() + options.time_limit
+        try:
+            return 'sat' if next(PatternSearch(instance, deadline).patterns(), False) is None else 'unsat'
+        except SearchTimeout:
+            return 'unknown'
+
+    # No model: the search works on the instance's steps and constraints directly
+    constraints = len(instance.separation_of_duty) + len(instance.at_most_k) + len(instance.one_team)
+    return solve, lambda: (instance.steps_count, constraints)
+
+
+BUILDERS = {'ortools': _build_ortools, 'doreen': _build_doreen, 'z3': _build_z3, 'pattern': _build_pattern}
+
+
+def measure(problem_path, backend, time_limit=None, options=None):
+    """Parse, preprocess, build and solve one instance in the current process and return its
+    measurements, the same way the solvers do. `options` is a SolverOptions."""
+    configure_output(verbose=False, spinners=False)
+    options = SolverOptions.resolve(options, time_limit)
+    importlib.import_module(BACKEND_MODULES[backend])
+    starttime = perf_counter()
+    instance = parse_instance(problem_path)
+    parse_time = perf_counter() - starttime
+
+    starttime = perf_counter()
+    reduced = reduce_instance(instance)
+    certificate = precheck_unsat(instance, reduced)
+    preprocess_time = perf_counter() - starttime
+
+    build_time = solve_time = 0.0
+    variables = constraints = 0
+    if certificate:
+        status = 'unsat'
+    else:
+        starttime = perf_counter()
+        solve, model_size = BUILDERS[backend](reduced.instance, options)
+        build_time = perf_counter() - starttime
+        variables, constraints = model_size()
+
+        starttime = perf_counter()
+        status = solve(options)
+        solve_time = perf_counter() - starttime
+
+    return {
+        'status': status,
+        'parse_time': parse_time,
+        'preprocess_time': preprocess_time,
+        'build_time': build_time,
+        'solve_time': solve_time,
+        'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        'variables': variables,
+        'constraints': constraints,
+    }
+
+
+def _measure_into(queue, problem_path, backend, time_limit, options):
+    try:
+        queue.put(measure(problem_path, backend, time_limit, options))
+    except Exception as e:
+        queue.put({'status': 'error', 'error': f"{type(e).__name__}: {e}"})
+
+
+def measure_isolated(problem_path, backend, time_limit=None, options=None):
+    """Run measure() in a freshly spawned process so peak RSS belongs to this run alone.
+
+    A process still running `time_limit` + RUN_LIMIT_GRACE seconds after it started is killed
+    and the run reported as 'timeout'; one that dies without reporting gives an 'error' run.
+    """
+    limit = SolverOptions.resolve(options, time_limit).time_limit
+    deadline = None if limit is None else perf_counter() + limit + RUN_LIMIT_GRACE
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=_measure_into, args=(queue, problem_path, backend, time_limit, options))
+    process.start()
+    try:
+        while True:
+            try:
+                return queue.get(timeout=0.5)
+            except Empty:
+                if process.exitcode is not None:
+                    return {'status': 'error', 'error': f"benchmark process exited with code {process.exitcode}"}
+                if deadline is not None and perf_counter() > deadline:
+                    return {'status': 'timeout', 'error': f"killed after {limit + RUN_LIMIT_GRACE:g}s"}
+    finally:
+        if process.is_alive():
+            process.terminate()
+        process.join()
+
+
+def benchmark_instance(problem_path, backend, repeats=3, warmups=1, time_limit=None, options=None):
+    """Measure one instance/backend pair `warmups + repeats` times and aggregate the timed runs."""
+    for _ in range(warmups):
+        measure_isolated(problem_path, backend, time_limit, options)
+    runs = [measure_isolated(problem_path, backend, time_limit, options) for _ in range(repeats)]
+    failed = [run for run in runs if run['status'] in ('error', 'timeout')]
+    if failed:
+        return failed[0]
+
+    statuses = {run['status'] for run in runs}
+    return {
+        'status': statuses.pop() if len(statuses) == 1 else 'inconsistent',
+        'parse_time': statistics.median(run['parse_time'] for run in runs),
+        'preprocess_time': statistics.median(run['preprocess_time'] for run in runs),
+        'build_time': statistics.median(run['build_time'] for run in runs),
+        'solve_time': statistics.median(run['solve_time'] for run in runs),
+        'solve_time_min': min(run['solve_time'] for run in runs),
+        'peak_rss_kb': max(run['peak_rss_kb'] for run in runs),
+        'variables': runs[0]['variables'],
+        'constraints': runs[0]['constraints'],
+    }
+
+
+def run_benchmark(paths, backends, repeats=3, warmups=1, time_limit=None, on_result=None, options=None):
+    """Benchmark every instance on every backend; results are keyed '<backend>:<instance path>'."""
+    results = {}
+    for backend in backends:
+        for path in paths:
+            key = f"{backend}:{os.path.relpath(path, BASE_PATH)}"
+            results[key] = benchmark_instance(path, backend, repeats, warmups, time_limit, options)
+            if on_result:
+                on_result(key, results[key])
+    return results
+
+
+def compare(results, baseline, tolerance=0.25, min_delta=0.05):
+    """List regressions of `results` against a stored baseline.
+
+    A run regresses when its status changes, its model grows, or its build or solve median
+    is more than `tolerance` (relative) and `min_delta` seconds (absolute) slower.
+    """
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        if result['status'] != base['status']:
+            regressions.append(f"{key}: status {base['status']} -> {result['status']}")
+            continue
+        if result['status'] in ('error', 'timeout'):
+            continue
+        for count in ('variables', 'constraints'):
+            if result[count] > base[count]:
+                regressions.append(f"{key}: {count} {base[count]} -> {result[count]}")
+        for phase in ('build_time', 'solve_time'):
+            if result[phase] > base[phase] * (1 + tolerance) and result[phase] - base[phase] > min_delta:
+                regressions.append(f"{key}: {phase} {base[phase]:.3f}s -> {result[phase]:.3f}s")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the WSP encodings on the bundled instances.")
+    parser.add_argument("instances", nargs="*", default=None,
+                        help="instance files, directories or glob patterns (default: quick suite)")
+    parser.add_argument("--backends", default=",".join(BENCHMARK_BACKENDS),
+                        help="comma separated backends (default: %(default)s)")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--warmups", type=int, default=1)
+    parser.add_argument("--time-limit", type=float, default=60, help="solver time limit per run in seconds")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline file (default: benchmarks/baseline.json)")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown")
+    parser.add_argument("--output", default=None, help="also write the results to this JSON file")
+    add_solver_arguments(parser)
+    args = parser.parse_args(argv)
+    options = solver_options(args)
+
+    backends = args.backends.split(",")
+    for backend in backends:
+        if backend not in BUILDERS:
+            parser.error(f"unknown backend {backend}")
+    patterns = args.instances or [os.path.join(BASE_PATH, p) for p in DEFAULT_SUITE]
+    paths = expand_instance_paths(patterns)
+
+    def report(key, result):
+        if result['status'] in ('error', 'timeout'):
+            print(f"{key}: {result['status']} {result['error']}")
+            return
+        print(f"{key}: {result['status']:<7} build {result['build_time'] * 1000:8.1f}ms  "
+              f"solve {result['solve_time'] * 1000:9.1f}ms  rss {result['peak_rss_kb'] / 1024:6.1f}MB  "
+              f"vars {result['variables']}  constraints {result['constraints']}")
+
+    results = run_benchmark(paths, backends, args.repeats, args.warmups, args.time_limit, on_result=report,
+                            options=options)
+    document = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'machine': f"{platform.node()} {platform.machine()} python {platform.python_version()}",
+        'repeats': args.repeats,
+        'time_limit': args.time_limit,
+        'options': {name: value for name, value in vars(options).items() if name != 'log_callback'},
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(document, file, indent=2)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, 'w') as file:
+            json.dump(document, file, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one")
+        return 0
+    with open(args.baseline) as file:
+        baseline = json.load(file)['results']
+    regressions = compare(results, baseline, args.tolerance)
+    unmatched = [key for key in results if key not in baseline]
+    if unmatched:
+        # compare() cannot judge these; re-record the baseline to cover them
+        print(f"\n{len(unmatched)} result(s) have no baseline entry, e.g. {unmatched[0]}")
+    print(f"\n{len(regressions)} regression(s) against {args.baseline}")
+    for regression in regressions:
+        print(f"- {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+import argparse
+import glob
+import os
+import sys
+
+from helper import configure_output, PHASES, SolverOptions, AT_MOST_K_ENCODINGS
+from wsp_runner import BACKENDS, default_output_dir, solve_instance, write_result
+
+
+def expand_instance_paths(patterns):
+    """Expand files, directories and glob patterns into instance files, skipping reference solutions."""
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = glob.glob(os.path.join(pattern, '*.txt'))
+        else:
+            matches = glob.glob(pattern) or [pattern]
+        for path in sorted(matches):
+            if not path.endswith('-solution.txt') and path not in paths:
+                paths.append(path)
+    return paths
+
+
+def add_solver_arguments(parser, default_workers=None):
+    """Command-line flags for the SolverOptions fields."""
+    group = parser.add_argument_group("solver options (CP-SAT; z3 uses --seed)")
+    group.add_argument("--solver-workers", type=int, default=default_workers,
+                       help="CP-SAT search workers (default: %(default)s, None = all cores)")
+    group.add_argument("--seed", type=int, default=None, help="random seed")
+    group.add_argument("--symmetry-level", type=int, default=None, help="CP-SAT symmetry_level")
+    group.add_argument("--linearization-level", type=int, default=None, help="CP-SAT linearization_level")
+    group.add_argument("--solver-log", action="store_true", help="print the CP-SAT search log to stderr")
+    group.add_argument("--at-most-k", choices=AT_MOST_K_ENCODINGS, default=None,
+                       help="At-most-k encoding of the ortools and z3 models (default: used for ortools, "
+                            "slots for z3)")
+
+
+def solver_options(args):
+    """SolverOptions from the flags added by add_solver_arguments."""
+    options = SolverOptions(seed=args.seed, symmetry_level=args.symmetry_level,
+                            linearization_level=args.linearization_level, at_most_k=args.at_most_k,
+                            log_callback=_print_solver_log if args.solver_log else None,
+                            split_presolve=getattr(args, 'timings', False))
+    if args.solver_workers is not None:
+        options.workers = args.solver_workers
+    return options
+
+
+def _print_solver_log(line):
+    print(line, file=sys.stderr)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Solve WSP instances without the GUI.")
+    parser.add_argument("instances", nargs="+", help="instance files, directories or glob patterns")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="ortools")
+    parser.add_argument("--mode", choices=["single", "multi"], default="single")
+    parser.add_argument("--solutions", type=int, default=10, help="solutions to collect in multi mode")
+    parser.add_argument("--min-distance", type=int, default=1,
+                        help="multi mode: minimum number of steps on which any two solutions differ")
+    parser.add_argument("--time-limit", type=float, default=None, help="time limit per instance in seconds")
+    parser.add_argument("--output-dir", default=None, help="output folder (default: output_<backend>)")
+    parser.add_argument("--format", choices=["text", "json"], default="text", dest="output_format")
+    add_solver_arguments(parser)
+    parser.add_argument("--verbose", action="store_true", help="print model-building messages")
+    parser.add_argument("--timings", action="store_true", help="print the time spent in every phase")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    configure_output(verbose=args.verbose, spinners=False)
+    output_dir = args.output_dir or default_output_dir(args.backend)
+    options = solver_options(args)
+
+    failed = 0
+    for path in expand_instance_paths(args.instances):
+        if not os.path.isfile(path):
+            print(f"{path}: no such instance file")
+            failed += 1
+            continue
+        d = solve_instance(path, args.backend, args.mode, args.solutions, args.time_limit, args.min_distance, options)
+        output_path = write_result(d, output_dir, args.output_format)
+        count = len(d['mul_sol']) if args.mode == 'multi' and d['sat'] == 'sat' else int(d['sat'] == 'sat')
+        status = "" if d['valid'] else " INVALID"
+        print(f"{path}: {d['sat']} ({count} solution(s), {d['exe_time']}){status} -> {output_path}")
+        if 'portfolio' in d:
+            print(f"    won by {d['winner'] or 'none'}: "
+                  + ", ".join(f"{backend} {status}" for backend, status in d['portfolio'].items()))
+        if 'selected' in d:
+            print(f"    selected {d['selected']}")
+        if 'unsat_reason' in d:
+            print(f"    {d['unsat_reason']}")
+        if args.timings:
+            print("    " + "  ".join(f"{phase} {d['timings'][phase]:.1f}ms" for phase in PHASES))
+        failed += not d['valid']
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
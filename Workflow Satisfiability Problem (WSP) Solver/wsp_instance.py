@@ -0,0 +1,162 @@
+import re
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Dict, List, Tuple, Union
+
+DEFAULT_CAPACITY = 20  # Capacity of users without a User-Capacity line
+
+
+@dataclass
+class WSPInstance:
+    """Parsed WSP instance shared by every model builder and the validator.
+
+    Steps and users are stored 0-based (s1 -> 0, u1 -> 0); the text format is
+    only used again when solutions are written out.
+    """
+    steps_count: int
+    users_count: int
+    constraints_count: int
+    authorisations: Dict[int, List[int]] = field(default_factory=dict)  # User -> allowed steps (explicit lines only)
+    user_step_masks: List[int] = field(default_factory=list)  # User -> bitset of steps the user may perform
+    separation_of_duty: List[Tuple[int, int]] = field(default_factory=list)  # Pairs of steps
+    binding_of_duty: List[Tuple[int, int]] = field(default_factory=list)  # Pairs of steps
+    at_most_k: List[Tuple[int, List[int]]] = field(default_factory=list)  # (k, steps)
+    one_team: List[Tuple[List[int], List[List[int]]]] = field(default_factory=list)  # (steps, teams)
+    user_capacities: Dict[int, int] = field(default_factory=dict)  # User -> capacity (explicit lines only)
+    capacities: List[int] = field(default_factory=list)  # User -> effective capacity
+    step_weights: List[int] = field(default_factory=list)  # Step -> original steps it stands for (see wsp_preprocess)
+
+    @cached_property
+    def step_user_masks(self) -> List[int]:
+        """Bitset of authorised users for every step."""
+        masks = [0] * self.steps_count
+        for user, step_mask in enumerate(self.user_step_masks):
+            user_bit = 1 << user
+            for step in range(self.steps_count):
+                if step_mask >> step & 1:
+                    masks[step] |= user_bit
+        return masks
+
+    @cached_property
+    def step_users(self) -> List[List[int]]:
+        """Sorted list of authorised users for every step."""
+        return [[u for u in range(self.users_count) if mask >> u & 1] for mask in self.step_user_masks]
+
+    @cached_property
+    def binding_classes(self) -> List[List[int]]:
+        """Steps grouped into the classes Binding-of-duty forces onto one user (union-find),
+        ordered by their first step; unbound steps form singleton classes."""
+        parent = list(range(self.steps_count))
+
+        def find(step):
+            while parent[step] != step:
+                parent[step] = parent[parent[step]]
+                step = parent[step]
+            return step
+
+        for step1, step2 in self.binding_of_duty:
+            parent[find(step1)] = find(step2)
+        classes = {}
+        for step in range(self.steps_count):
+            classes.setdefault(find(step), []).append(step)
+        return list(classes.values())
+
+    @cached_property
+    def team_masks(self) -> List[List[int]]:
+        """Bitset of the members of every team, per One-team constraint."""
+        return [[sum(1 << u for u in set(team)) for team in teams] for _, teams in self.one_team]
+
+    @cached_property
+    def one_team_conflicts(self) -> List[Tuple[int, int, int, int]]:
+        """(constraint, team, other constraint, other team) for every two teams that cannot both be
+        selected: their One-team constraints share a step, but the teams share no member.
+
+        Each pair of constraints is compared once, however many steps they share, so every
+        conflict appears once.
+        """
+        step_constraints = [[] for _ in range(self.steps_count)]
+        for c_idx, (steps, _) in enumerate(self.one_team):
+            for step in set(steps):
+                step_constraints[step].append(c_idx)
+        pairs = {(c1, c2) for constraints in step_constraints
+                 for i, c1 in enumerate(constraints) for c2 in constraints[i + 1:]}
+
+        conflicts = []
+        for c1, c2 in sorted(pairs):
+            for t1, mask1 in enumerate(self.team_masks[c1]):
+                for t2, mask2 in enumerate(self.team_masks[c2]):
+                    if not mask1 & mask2:
+                        conflicts.append((c1, t1, c2, t2))
+        return conflicts
+
+    def is_authorised(self, step: int, user: int) -> bool:
+        return bool(self.user_step_masks[user] >> step & 1)
+
+    def authorised_steps(self, user: int) -> List[int]:
+        mask = self.user_step_masks[user]
+        return [s for s in range(self.steps_count) if mask >> s & 1]
+
+
+def parse_instance(filename: str) -> WSPInstance:
+    """Parse a WSP instance file once into a WSPInstance."""
+    with open(filename, 'r') as file:
+        lines = file.readlines()
+
+    # Parse #Steps, #Users, #Constraints
+    instance = WSPInstance(
+        steps_count=int(lines[0].split(': ')[1]),
+        users_count=int(lines[1].split(': ')[1]),
+        constraints_count=int(lines[2].split(': ')[1]),
+    )
+    all_steps = (1 << instance.steps_count) - 1
+    instance.user_step_masks = [all_steps] * instance.users_count
+
+    for line in lines[3:]:
+        parts = line.split()
+        if not parts:
+            continue
+
+        if parts[0] == "Authorisations":
+            user = int(parts[1][1:]) - 1
+            if user in instance.authorisations:
+                print(f"Warning: User u{user + 1} has multiple authorisations defined; only the first will be used.")
+                continue
+            allowed_steps = [int(s[1:]) - 1 for s in parts[2:]]
+            instance.authorisations[user] = allowed_steps
+            mask = 0
+            for step in allowed_steps:
+                mask |= 1 << step
+            instance.user_step_masks[user] = mask
+
+        elif parts[0] == "Separation-of-duty":
+            instance.separation_of_duty.append((int(parts[1][1:]) - 1, int(parts[2][1:]) - 1))
+
+        elif parts[0] == "Binding-of-duty":
+            instance.binding_of_duty.append((int(parts[1][1:]) - 1, int(parts[2][1:]) - 1))
+
+        elif parts[0] == "At-most-k":
+            k = int(parts[1])
+            instance.at_most_k.append((k, [int(s[1:]) - 1 for s in parts[2:]]))
+
+        elif parts[0] == "One-team":
+            steps = [int(s) - 1 for s in re.findall(r's(\d+)', line)]
+            teams_raw = re.findall(r'\(([^)]+)\)', line)
+            teams = [[int(u) - 1 for u in re.findall(r'u(\d+)', team)] for team in teams_raw]
+            if not steps or not teams:
+                print(f"Warning: Unable to parse One-team constraint: {line.strip()}")
+                continue
+            instance.one_team.append((steps, teams))
+
+        elif parts[0] == "User-Capacity":
+            instance.user_capacities[int(parts[1][1:]) - 1] = int(parts[2])
+
+    instance.capacities = [instance.user_capacities.get(u, DEFAULT_CAPACITY) for u in range(instance.users_count)]
+    instance.step_weights = [1] * instance.steps_count
+    return instance
+
+
+def load_instance(problem: Union[str, WSPInstance]) -> WSPInstance:
+    """Return `problem` unchanged if it is already parsed, otherwise parse the file it names."""
+    if isinstance(problem, WSPInstance):
+        return problem
+    return parse_instance(problem)
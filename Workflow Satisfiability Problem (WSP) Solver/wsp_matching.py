@@ -0,0 +1,153 @@
+from collections import deque
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+class CapacitatedMatching:
+    """Maximum flow from steps to users, ignoring every constraint but authorisation and capacity.
+
+    Step s needs `demands[s]` units (the weight of a merged Binding-of-duty step), user u can
+    supply `capacities[u]`, and units only travel along authorised (step, user) pairs. A full
+    flow is necessary for a solution to exist, so a deficient flow proves the instance unsat,
+    and a pair that carries no units in any full flow can be removed from every model.
+    """
+
+    def __init__(self, step_users: Sequence[Sequence[int]], demands: Sequence[int], capacities: Sequence[int]):
+        self.step_users = step_users
+        self.demands = list(demands)
+        self.capacities = list(capacities)
+        self.flow: List[Dict[int, int]] = [{} for _ in step_users]  # step -> user -> units
+        self.user_flow: List[Dict[int, int]] = [{} for _ in capacities]  # user -> step -> units
+        self.load = [0] * len(capacities)
+        self.matched = [0] * len(step_users)
+
+    def _augment(self, step: int) -> bool:
+        """Push one unit from `step` along a shortest augmenting path (BFS in the residual graph)."""
+        step_parent = {step: None}
+        user_parent = {}
+        queue = deque([step])
+        while queue:
+            current = queue.popleft()
+            for user in self.step_users[current]:
+                if user in user_parent:
+                    continue
+                user_parent[user] = current
+                if self.load[user] < self.capacities[user]:
+                    self._apply(user, step_parent, user_parent)
+                    return True
+                for other in self.user_flow[user]:
+                    if other not in step_parent:
+                        step_parent[other] = user
+                        queue.append(other)
+        return False
+
+    def _apply(self, user, step_parent, user_parent):
+        self.load[user] += 1
+        while user is not None:
+            step = user_parent[user]
+            self._shift(step, user, 1)
+            previous = step_parent[step]
+            if previous is not None:
+                self._shift(step, previous, -1)
+            user = previous
+
+    def _shift(self, step, user, units):
+        count = self.flow[step].get(user, 0) + units
+        if count:
+            self.flow[step][user] = count
+            self.user_flow[user][step] = count
+        else:
+            del self.flow[step][user]
+            del self.user_flow[user][step]
+
+    def solve(self) -> int:
+        """Saturate as many step demands as possible and return the total flow."""
+        for step, demand in enumerate(self.demands):
+            while self.matched[step] < demand and self._augment(step):
+                self.matched[step] += 1
+        return sum(self.matched)
+
+    def is_complete(self) -> bool:
+        return self.matched == self.demands
+
+    def hall_violation(self) -> Optional[Tuple[List[int], List[int]]]:
+        """After solve(): a set of steps and the users authorised for any of them, where the
+        steps need more units than those users can supply, or None if the flow is complete."""
+        deficient = [s for s, demand in enumerate(self.demands) if self.matched[s] < demand]
+        if not deficient:
+            return None
+        # Everything reachable from a deficient step in the residual graph
+        steps, users = set(deficient), set()
+        queue = deque(deficient)
+        while queue:
+            step = queue.popleft()
+            for user in self.step_users[step]:
+                if user not in users:
+                    users.add(user)
+                    for other in self.user_flow[user]:
+                        if other not in steps:
+                            steps.add(other)
+                            queue.append(other)
+        return sorted(steps), sorted(users)
+
+    def usable_pairs(self) -> List[List[int]]:
+        """After a complete solve(): for every step, the users that carry some of its units in at
+        least one full flow.
+
+        A pair without flow can take some iff the user reaches the step back in the residual
+        graph (steps, users and the sink), i.e. both lie on one strongly connected component.
+        Every solution is a full flow, so the other pairs appear in no solution.
+        """
+        steps_count = len(self.step_users)
+        sink = steps_count + len(self.capacities)
+        # Residual graph: step -> user along authorised pairs, user -> step where units flow,
+        # user -> sink with spare capacity, sink -> user with load
+        edges = [[steps_count + u for u in users if self.flow[step].get(u, 0) < self.demands[step]]
+                 for step, users in enumerate(self.step_users)]
+        edges += [list(self.user_flow[u]) + ([sink] if self.load[u] < self.capacities[u] else [])
+                  for u in range(len(self.capacities))]
+        edges.append([steps_count + u for u, load in enumerate(self.load) if load])
+        component = _strongly_connected(edges)
+        return [[u for u in users if u in self.flow[step] or component[step] == component[steps_count + u]]
+                for step, users in enumerate(self.step_users)]
+
+
+def _strongly_connected(edges: List[List[int]]) -> List[int]:
+    """Component index of every node (iterative Tarjan)."""
+    count = len(edges)
+    index, low, component = [-1] * count, [0] * count, [-1] * count
+    stack, on_stack, counter, components = [], [False] * count, 0, 0
+    for root in range(count):
+        if index[root] != -1:
+            continue
+        work = [(root, 0)]
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        while work:
+            node, position = work[-1]
+            if position < len(edges[node]):
+                work[-1] = (node, position + 1)
+                nxt = edges[node][position]
+                if index[nxt] == -1:
+                    index[nxt] = low[nxt] = counter
+                    counter += 1
+                    stack.append(nxt)
+                    on_stack[nxt] = True
+                    work.append((nxt, 0))
+                elif on_stack[nxt]:
+                    low[node] = min(low[node], index[nxt])
+                continue
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[node])
+            if low[node] == index[node]:
+                while True:
+                    member = stack.pop()
+                    on_stack[member] = False
+                    component[member] = components
+                    if member == node:
+                        break
+                components += 1
+    return component
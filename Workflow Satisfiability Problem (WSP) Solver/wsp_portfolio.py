@@ -0,0 +1,103 @@
+"""Portfolio mode: race several backends on one instance and keep the first definitive answer.
+
+Which encoding is fastest varies a lot from instance to instance, so instead of picking one the
+portfolio starts every backend in its own process and returns as soon as one of them reports
+sat or unsat; the others are terminated. Latency is then the minimum over the encodings, plus
+the start-up of a spawned process.
+"""
+import multiprocessing
+import os
+from dataclasses import replace
+from queue import Empty
+
+from helper import configure_output, SolverOptions
+from wsp_instance import load_instance
+from wsp_runner import backend_functions
+
+PORTFOLIO_BACKENDS = ('ortools', 'doreen', 'z3')
+CP_SAT_BACKENDS = ('ortools', 'doreen')
+
+
+def _race_into(queue, backend, mode, instance, kwargs):
+    # Racers share the terminal, so keep their output quiet
+    configure_output(verbose=False, spinners=False)
+    try:
+        solve_single, solve_multi = backend_functions(backend)
+        d = solve_multi(instance, **kwargs) if mode == 'multi' else solve_single(instance, **kwargs)
+        queue.put((backend, d, None))
+    except Exception as e:
+        queue.put((backend, None, f"{type(e).__name__}: {e}"))
+
+
+def _share_cores(options, backends):
+    """Give every CP-SAT racer at most its share of the cores, so they don't slow each other down."""
+    racers = sum(backend in CP_SAT_BACKENDS for backend in backends)
+    share = max(1, (os.cpu_count() or 1) // max(1, racers))
+    return replace(options, workers=min(options.workers, share))
+
+
+def race(problem, mode='single', backends=PORTFOLIO_BACKENDS, **kwargs):
+    """Run the `mode` solve function of every backend in `backends` on `problem` concurrently.
+
+    Returns the result dict of the first backend that answers sat or unsat, extended with
+    'winner' (that backend) and 'portfolio' (backend -> status, 'cancelled' for the ones that
+    were terminated). If no backend gives a definitive answer the first 'unknown' result is
+    returned with 'winner' None; if every backend fails a RuntimeError lists their errors.
+    """
+    instance = load_instance(problem)
+    kwargs['options'] = _share_cores(SolverOptions.resolve(kwargs.get('options')), backends)
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    processes = {backend: context.Process(target=_race_into, args=(queue, backend, mode, instance, kwargs),
+                                          daemon=True)
+                 for backend in backends}
+    for process in processes.values():
+        process.start()
+
+    outcomes, errors = {}, {}
+    winner, fallback = None, None
+    try:
+        while winner is None and len(outcomes) < len(processes):
+            try:
+                backend, d, error = queue.get(timeout=0.1)
+            except Empty:
+                # A racer that died without reporting (e.g. killed by the OS) must not stall the race
+                for backend, process in processes.items():
+                    if backend not in outcomes and process.exitcode not in (None, 0):
+                        outcomes[backend] = 'error'
+                        errors[backend] = f"exited with code {process.exitcode}"
+                continue
+            if error:
+                outcomes[backend], errors[backend] = 'error', error
+            else:
+                outcomes[backend] = d['sat']
+                if d['sat'] in ('sat', 'unsat'):
+                    winner = (backend, d)
+                elif fallback is None:
+                    fallback = (backend, d)
+    finally:
+        for process in processes.values():
+            if process.is_alive():
+                process.terminate()
+            process.join()
+
+    if winner is None and fallback is None:
+        raise RuntimeError("every portfolio backend failed: "
+                           + "; ".join(f"{backend}: {error}" for backend, error in errors.items()))
+    backend, d = winner or fallback
+    d['winner'] = backend if winner else None
+    d['portfolio'] = {name: outcomes.get(name, 'cancelled') for name in backends}
+    return d
+
+
+def solve_single_solution(problem, time_limit=None, options=None, backends=PORTFOLIO_BACKENDS):
+    """Race `backends` for one assignment; see race()."""
+    return race(problem, 'single', backends, time_limit=time_limit, options=options)
+
+
+def solve_multi_solution(problem, validator=None, max_solutions=10, time_limit=None, min_distance=1, options=None,
+                         backends=PORTFOLIO_BACKENDS):
+    """Race `backends` in multi-solution mode and keep the solutions of the first one to finish.
+    Every racer builds its own validator, so `validator` is not used."""
+    return race(problem, 'multi', backends, max_solutions=max_solutions, time_limit=time_limit,
+                min_distance=min_distance, options=options)
@@ -0,0 +1,134 @@
+import argparse
+import sys
+from dataclasses import dataclass, field, asdict
+from typing import List, Optional
+
+from wsp_instance import WSPInstance, load_instance
+from wsp_matching import CapacitatedMatching
+from wsp_preprocess import ReducedInstance, reduce_instance
+
+
+@dataclass
+class UnsatCertificate:
+    """Why an instance has no solution; steps and users are 0-based."""
+    check: str  # Which pre-check found it
+    message: str
+    steps: List[int] = field(default_factory=list)
+    users: List[int] = field(default_factory=list)
+
+    def __str__(self):
+        return self.message
+
+    def to_dict(self):
+        return asdict(self)
+
+
+def _steps_text(steps):
+    return ", ".join(f"s{s + 1}" for s in steps)
+
+
+def check_separation_binding(instance: WSPInstance, reduced: ReducedInstance) -> Optional[UnsatCertificate]:
+    """A Separation-of-duty pair whose steps Binding-of-duty forces onto one user."""
+    step_class = {step: c_idx for c_idx, steps in enumerate(reduced.step_classes) for step in steps}
+    for step1, step2 in instance.separation_of_duty:
+        if step_class[step1] == step_class[step2]:
+            bound = reduced.step_classes[step_class[step1]]
+            return UnsatCertificate(
+                'separation-binding',
+                f"Separation-of-duty s{step1 + 1} s{step2 + 1} contradicts Binding-of-duty, "
+                f"which puts {_steps_text(bound)} on one user",
+                steps=bound)
+    return None
+
+
+def check_authorisations(instance: WSPInstance, reduced: ReducedInstance) -> Optional[UnsatCertificate]:
+    """A step nobody is authorised for, or a bound class no single user can take."""
+    for step, users in enumerate(instance.step_users):
+        if not users:
+            return UnsatCertificate('no-authorised-user', f"No user is authorised for step s{step + 1}", steps=[step])
+    for c_idx, users in enumerate(reduced.instance.step_users):
+        if not users:
+            steps = reduced.step_classes[c_idx]
+            return UnsatCertificate(
+                'binding-authorisation',
+                f"Binding-of-duty puts {_steps_text(steps)} on one user, but no user is authorised "
+                f"for all of them with enough capacity",
+                steps=steps)
+    return None
+
+
+def check_one_team(instance: WSPInstance, reduced: ReducedInstance) -> Optional[UnsatCertificate]:
+    """A one-team group in which every team lacks an authorised member for some step."""
+    for steps, teams in instance.one_team:
+        viable = False
+        for team in teams:
+            team_mask = 0
+            for user in team:
+                if user < instance.users_count:
+                    team_mask |= 1 << user
+            if all(instance.step_user_masks[s] & team_mask for s in steps):
+                viable = True
+                break
+        if not viable:
+            return UnsatCertificate(
+                'one-team',
+                f"One-team on {_steps_text(steps)}: every team has a step none of its members is authorised for",
+                steps=list(steps))
+    return None
+
+
+def check_hall(instance: WSPInstance, reduced: ReducedInstance) -> Optional[UnsatCertificate]:
+    """Hall's condition: the steps must fit into the authorised users' capacities."""
+    matching = reduced.matching
+    if matching is None:
+        matching = CapacitatedMatching(reduced.instance.step_users, reduced.instance.step_weights,
+                                       reduced.instance.capacities)
+        matching.solve()
+    violation = matching.hall_violation()
+    if violation is None:
+        return None
+    classes, users = violation
+    steps = sorted(s for c_idx in classes for s in reduced.step_classes[c_idx])
+    capacity = sum(reduced.instance.capacities[u] for u in users)
+    return UnsatCertificate(
+        'hall',
+        f"Steps {_steps_text(steps)} can only be done by {len(users)} user(s) with a total capacity "
+        f"of {capacity}, fewer than the {len(steps)} steps",
+        steps=steps, users=users)
+
+
+PRECHECKS = [check_separation_binding, check_authorisations, check_one_team, check_hall]
+
+
+def precheck_unsat(problem, reduced: Optional[ReducedInstance] = None) -> Optional[UnsatCertificate]:
+    """Run the cheap unsat checks in order and return the first certificate found, or None
+    when none of them applies (which does not mean the instance is satisfiable)."""
+    instance = load_instance(problem)
+    reduced = reduced or reduce_instance(instance)
+    for check in PRECHECKS:
+        certificate = check(instance, reduced)
+        if certificate:
+            return certificate
+    return None
+
+
+def main(argv=None):
+    from wsp_cli import expand_instance_paths
+
+    parser = argparse.ArgumentParser(description="Try to prove WSP instances unsat without a solver.")
+    parser.add_argument("instances", nargs="+", help="instance files, directories or glob patterns")
+    args = parser.parse_args(argv)
+
+    for path in expand_instance_paths(args.instances):
+        reduced = reduce_instance(load_instance(path))
+        certificate = precheck_unsat(reduced.original, reduced)
+        if certificate:
+            print(f"{path}: unsat ({certificate.check}) {certificate.message}")
+        else:
+            print(f"{path}: no proof ({reduced.pruned_pairs} pair(s) pruned, "
+                  f"{len(reduced.forced_users)} step(s) forced)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+from wsp_instance import WSPInstance
+from wsp_matching import CapacitatedMatching
+
+
+@dataclass
+class ReducedInstance:
+    """A WSP instance with Binding-of-duty classes collapsed into super-steps.
+
+    `instance` is an ordinary WSPInstance over the super-steps (so every model builder accepts
+    it); `step_classes[c]` lists the original steps of super-step c. Contradictions the
+    reduction exposes (SoD inside a class, a super-step nobody can take) are reported by
+    wsp_prechecks. `matching` is the authorisation/capacity flow used to prune the super-steps'
+    users, and `pruned_pairs` counts the (super-step, user) pairs it removed.
+    """
+    original: WSPInstance
+    instance: WSPInstance
+    step_classes: List[List[int]]
+    matching: Optional[CapacitatedMatching] = None
+    pruned_pairs: int = 0
+
+    @property
+    def forced_users(self) -> Dict[int, int]:
+        """Original steps whose only remaining user is forced on them (step -> user)."""
+        return {step: users[0] for steps, users in zip(self.step_classes, self.instance.step_users)
+                if len(users) == 1 for step in steps}
+
+    def expand(self, users: Sequence[int]) -> List[int]:
+        """Map one user per super-step back to one user per original step."""
+        full = [0] * self.original.steps_count
+        for c_idx, steps in enumerate(self.step_classes):
+            for step in steps:
+                full[step] = users[c_idx]
+        return full
+
+
+def reduce_instance(instance: WSPInstance) -> ReducedInstance:
+    """Collapse Binding-of-duty classes into super-steps and rewrite the other constraints.
+
+    A super-step may only go to users authorised for all of its steps whose capacity covers
+    the whole class; its weight (number of original steps) is kept in `step_weights` for the
+    capacity constraints. SoD pairs are deduplicated, at-most-k groups that span no more than
+    k super-steps are dropped, and one-team groups are rewritten onto super-steps. Finally
+    users are removed from super-steps they cannot take in any capacity-respecting assignment
+    of all super-steps (see CapacitatedMatching.usable_pairs).
+    """
+    classes = instance.binding_classes
+    step_class = [0] * instance.steps_count
+    for c_idx, steps in enumerate(classes):
+        for step in steps:
+            step_class[step] = c_idx
+    weights = [sum(instance.step_weights[s] for s in steps) for steps in classes]
+
+    user_step_masks = _class_authorisations(instance, classes, weights)
+    matching, pruned_pairs = _prune_by_matching(user_step_masks, weights, instance.capacities)
+    authorisations = {user: [c for c in range(len(classes)) if user_step_masks[user] >> c & 1]
+                      for user in instance.authorisations}
+
+    separation_of_duty = []
+    for step1, step2 in instance.separation_of_duty:
+        c1, c2 = sorted((step_class[step1], step_class[step2]))
+        # A pair inside one class can never hold; it is dropped here and reported by wsp_prechecks
+        if c1 != c2 and (c1, c2) not in separation_of_duty:
+            separation_of_duty.append((c1, c2))
+
+    at_most_k = []
+    for k, steps in instance.at_most_k:
+        group = sorted({step_class[s] for s in steps})
+        if len(group) > k:
+            at_most_k.append((k, group))
+
+    one_team = [(sorted({step_class[s] for s in steps}), teams) for steps, teams in instance.one_team]
+
+    reduced = WSPInstance(
+        steps_count=len(classes),
+        users_count=instance.users_count,
+        constraints_count=len(separation_of_duty) + len(at_most_k) + len(one_team) + len(instance.user_capacities),
+        authorisations=authorisations,
+        user_step_masks=user_step_masks,
+        separation_of_duty=separation_of_duty,
+        at_most_k=at_most_k,
+        one_team=one_team,
+        user_capacities=dict(instance.user_capacities),
+        capacities=list(instance.capacities),
+        step_weights=weights,
+    )
+    return ReducedInstance(instance, reduced, classes, matching, pruned_pairs)
+
+
+def _class_authorisations(instance, classes, weights):
+    """Bitset of super-steps per user: a user may take a super-step if it may take every step in
+    it and has the capacity to take them all. Works on the bitsets rather than bit by bit, since
+    this runs on every solve."""
+    if len(classes) == instance.steps_count:
+        # Every class is a singleton (classes[c] == [c]), so only the capacities can remove steps
+        user_step_masks = list(instance.user_step_masks)
+        max_weight = max(weights, default=0)
+        for user, capacity in enumerate(instance.capacities):
+            if capacity >= max_weight:
+                continue
+            heavy = sum(1 << s for s, weight in enumerate(weights) if weight > capacity)
+            user_step_masks[user] &= ~heavy
+        return user_step_masks
+
+    user_step_masks = [0] * instance.users_count
+    for c_idx, steps in enumerate(classes):
+        users_mask = instance.step_user_masks[steps[0]]
+        for step in steps[1:]:
+            users_mask &= instance.step_user_masks[step]
+        while users_mask:
+            low = users_mask & -users_mask
+            user = low.bit_length() - 1
+            if weights[c_idx] <= instance.capacities[user]:
+                user_step_masks[user] |= 1 << c_idx
+            users_mask ^= low
+    return user_step_masks
+
+
+def _prune_by_matching(user_step_masks, weights, capacities):
+    """Clear the mask bits of pairs that carry no units in any full flow, in place. Nothing is
+    pruned when the flow is deficient; wsp_prechecks reports that as a Hall violation."""
+    class_users = [[u for u, mask in enumerate(user_step_masks) if mask >> c_idx & 1] for c_idx in range(len(weights))]
+    matching = CapacitatedMatching(class_users, weights, capacities)
+    matching.solve()
+    if not matching.is_complete():
+        return matching, 0
+    pruned_pairs = 0
+    for c_idx, (users, usable) in enumerate(zip(class_users, matching.usable_pairs())):
+        for user in set(users) - set(usable):
+            user_step_masks[user] &= ~(1 << c_idx)
+            pruned_pairs += 1
+    return matching, pruned_pairs
@@ -0,0 +1,84 @@
+import importlib
+import json
+import os
+
+from helper import save_solution, solution_output_location, format_solution_output, PhaseTimer
+from ValidatorPro import WorkflowValidator
+from wsp_instance import load_instance
+
+# Backend name -> (module, single-solution function, multi-solution function, output folder).
+# Modules are imported on first use so that e.g. the OR-Tools backend runs without z3 installed.
+BACKENDS = {
+    'ortools': ('WSP_Solver_ortools', 'SolverSingleSolution', 'SolverMultiSolution', 'output_ortools'),
+    'doreen': ('WSP_Solver_Doreen', 'SolverSingleSolution', 'SolverMultiSolution', 'output_doreen'),
+    'z3': ('WSP_Solver_z3', 'solve_single_solution', 'solve_multi_solution', 'output_z3'),
+    'pattern': ('WSP_Solver_pattern', 'SolverSingleSolution', 'SolverMultiSolution', 'output_pattern'),
+    'portfolio': ('wsp_portfolio', 'solve_single_solution', 'solve_multi_solution', 'output_portfolio'),
+    'auto': ('wsp_selector', 'solve_single_solution', 'solve_multi_solution', 'output_auto'),
+}
+
+
+def backend_functions(backend):
+    """Return the (single, multi) solve functions of a backend."""
+    module_name, single_name, multi_name, _ = BACKENDS[backend]
+    module = importlib.import_module(module_name)
+    return getattr(module, single_name), getattr(module, multi_name)
+
+
+def default_output_dir(backend):
+    """Output folder a backend writes to when run from its own script."""
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), BACKENDS[backend][3])
+
+
+def solve_instance(problem_path, backend='ortools', mode='single', max_solutions=10, time_limit=None, min_distance=1,
+                   options=None):
+    """Solve one instance file and validate the result. In multi mode any two solutions differ
+    on at least `min_distance` steps; `options` (a SolverOptions) is handed to the backend.
+
+    Returns the solver result dict extended with 'instance', 'backend', 'mode' and 'valid'
+    (False if any reported solution fails validation). Its 'timings' include the parse and
+    validation done here.
+    """
+    solve_single, solve_multi = backend_functions(backend)
+    timer = PhaseTimer()
+    with timer.phase('parse'):
+        instance = load_instance(problem_path)
+    validator = WorkflowValidator(instance)
+
+    if mode == 'multi':
+        d = solve_multi(instance, validator, max_solutions=max_solutions, time_limit=time_limit,
+                        min_distance=min_distance, options=options)
+        solutions = d['mul_sol'] if d['sat'] == 'sat' else []
+    else:
+        d = solve_single(instance, time_limit=time_limit, options=options)
+        solutions = [d['sol']] if d['sat'] == 'sat' else []
+
+    valid = True
+    with timer.phase('validation'):
+        for solution in solutions:
+            is_valid, _ = validator.validate([int(line.split(': u')[1]) for line in solution])
+            valid = valid and is_valid
+
+    for phase, ms in timer.timings.items():
+        d['timings'][phase] += ms
+    d.update({'instance': problem_path, 'backend': backend, 'mode': mode, 'valid': valid})
+    return d
+
+
+def write_result(d, output_dir, output_format='text'):
+    """Write a solve_instance result into the output_<backend>/<folder>/ layout and return the path.
+
+    The time spent writing is added to d['timings']['write'] (after a JSON file is written,
+    so the file itself reports it as 0).
+    """
+    timer = PhaseTimer()
+    with timer.phase('write'):
+        multi = d['mode'] == 'multi'
+        solution_dir, file_name = solution_output_location(output_dir, d['instance'], multi=multi)
+        if output_format == 'json':
+            file_name = os.path.splitext(file_name)[0] + '.json'
+            output_path = save_solution(solution_dir, file_name, [json.dumps(d, indent=2)])
+        else:
+            output_path = save_solution(solution_dir, file_name, format_solution_output(d, multi=multi))
+    d['timings']['write'] += timer.timings['write']
+    return output_path
@@ -0,0 +1,227 @@
+"""Backend selection: predict the fastest backend for an instance from recorded benchmarks.
+
+Racing every encoding (wsp_portfolio) costs one process per backend. The selector instead looks
+up the instances of the benchmark history (wsp_benchmark.py result files) whose features are
+closest to the new one and routes it to the backend that was fastest on them.
+"""
+import argparse
+import glob
+import json
+import math
+import os
+import statistics
+import sys
+from functools import lru_cache
+
+from helper import configure_output
+from wsp_cli import expand_instance_paths
+from wsp_instance import load_instance, parse_instance
+from wsp_runner import backend_functions
+
+BASE_PATH = os.path.dirname(os.path.abspath(__file__))
+HISTORY_PATTERN = os.path.join(BASE_PATH, 'benchmarks', '*.json')
+DEFAULT_BACKEND = 'ortools'  # Used when there is no history to learn from, or none close enough
+# Distance (in standardised feature units) beyond which the nearest recorded instance says nothing
+# about a new one. Recorded instances mostly lie within about 1 of their nearest neighbour;
+# before benchmarks/hard.json was recorded, the 60-step hard instances lay 3.5-5 away from all
+MAX_NEIGHBOUR_DISTANCE = 3.0
+TIMEOUT_PENALTY = 2  # A run without a definitive answer costs twice the time limit (PAR-2)
+
+FEATURES = ('steps', 'users', 'authorisation_density', 'separation_of_duty', 'binding_of_duty', 'at_most_k',
+            'one_team', 'capacity_tightness')
+# Counts are compared on a log scale, so 10 vs 20 steps weighs as much as 100 vs 200
+LOG_FEATURES = ('steps', 'users', 'separation_of_duty', 'binding_of_duty', 'at_most_k', 'one_team')
+
+
+def instance_features(instance):
+    """Feature dict of a parsed instance (see FEATURES).
+
+    `authorisation_density` is the fraction of (step, user) pairs that are authorised and
+    `capacity_tightness` the number of steps over the steps the users can take in total (each
+    user counting at most its capacity); above 1 the instance cannot be satisfied.
+    """
+    steps, users = instance.steps_count, instance.users_count
+    authorised = [bin(mask).count('1') for mask in instance.user_step_masks]
+    room = sum(min(count, capacity) for count, capacity in zip(authorised, instance.capacities))
+    return {
+        'steps': steps,
+        'users': users,
+        'authorisation_density': sum(authorised) / (steps * users) if steps and users else 0.0,
+        'separation_of_duty': len(instance.separation_of_duty),
+        'binding_of_duty': len(instance.binding_of_duty),
+        'at_most_k': len(instance.at_most_k),
+        'one_team': len(instance.one_team),
+        'capacity_tightness': steps / room if room else float(steps > 0),
+    }
+
+
+def _cheapest(costs):
+    """Backend with the lowest predicted cost; ties (e.g. every backend timing out on the
+    neighbours) and an empty prediction go to DEFAULT_BACKEND."""
+    if not costs:
+        return DEFAULT_BACKEND
+    return min(costs, key=lambda backend: (costs[backend], backend != DEFAULT_BACKEND))
+
+
+def _feature_vector(features):
+    return [math.log1p(features[name]) if name in LOG_FEATURES else features[name] for name in FEATURES]
+
+
+def _instance_file(instance_path):
+    # History keys are relative to this folder (see wsp_benchmark.run_benchmark)
+    return instance_path if os.path.isabs(instance_path) else os.path.join(BASE_PATH, instance_path)
+
+
+def load_history(paths):
+    """Read wsp_benchmark.py result files into {instance path: {backend: cost in seconds}}.
+
+    The cost of a run is its build plus solve time; runs that ended unknown or were killed
+    (timeout) count as TIMEOUT_PENALTY times the file's time limit, and errors are left out. Later files
+    override earlier ones for the same instance and backend.
+    """
+    history = {}
+    for path in paths:
+        with open(path) as file:
+            document = json.load(file)
+        penalty = TIMEOUT_PENALTY * (document.get('time_limit') or 0)
+        for key, result in document['results'].items():
+            backend, instance_path = key.split(':', 1)
+            if result['status'] == 'error':
+                continue
+            if result['status'] in ('sat', 'unsat'):
+                cost = result['build_time'] + result['solve_time']
+            elif result['status'] == 'timeout':
+                cost = penalty
+            else:
+                cost = max(penalty, result['build_time'] + result['solve_time'])
+            history.setdefault(instance_path, {})[backend] = cost
+    return history
+
+
+class BackendSelector:
+    """k-nearest-neighbour selector over the instances of a benchmark history.
+
+    Features are standardised over the history; for a new instance every backend gets the
+    mean log cost it had on the `k` closest recorded instances, and the cheapest one wins.
+    If even the closest one is more than `max_distance` away the selector has nothing to go on
+    and falls back to DEFAULT_BACKEND.
+    """
+
+    def __init__(self, history, k=5, max_distance=MAX_NEIGHBOUR_DISTANCE):
+        self.k = k
+        self.max_distance = max_distance
+        self.rows = []  # (feature vector, {backend: cost}, instance path)
+        for instance_path, costs in sorted(history.items()):
+            path = _instance_file(instance_path)
+            if not os.path.isfile(path):
+                continue
+            self.rows.append((_feature_vector(instance_features(parse_instance(path))), costs, instance_path))
+        columns = list(zip(*(row[0] for row in self.rows))) or [[0.0]] * len(FEATURES)
+        self.means = [statistics.fmean(column) for column in columns]
+        self.scales = [statistics.pstdev(column) or 1.0 for column in columns]
+        self.rows = [(self._standardise(vector), costs, path) for vector, costs, path in self.rows]
+
+    @classmethod
+    def from_files(cls, paths=None, k=5, max_distance=MAX_NEIGHBOUR_DISTANCE):
+        """Selector trained on the given result files (default: benchmarks/*.json)."""
+        return cls(load_history(sorted(glob.glob(HISTORY_PATTERN)) if paths is None else paths), k, max_distance)
+
+    def _standardise(self, vector):
+        return [(value - mean) / scale for value, mean, scale in zip(vector, self.means, self.scales)]
+
+    def predicted_costs(self, features, exclude=None):
+        """Backend -> predicted cost (seconds) for an instance with these features; the history
+        instance `exclude` is left out (for leave-one-out evaluation). Empty when no recorded
+        instance lies within `max_distance`."""
+        vector = self._standardise(_feature_vector(features))
+        rows = [(math.dist(vector, row[0]), row[1]) for row in self.rows if row[2] != exclude]
+        nearest = sorted(rows, key=lambda row: row[0])[:self.k]
+        if not nearest or nearest[0][0] > self.max_distance:
+            return {}
+        logs = {}
+        for _, costs in nearest:
+            for backend, cost in costs.items():
+                logs.setdefault(backend, []).append(math.log(cost + 1e-3))
+        return {backend: math.exp(statistics.fmean(values)) - 1e-3 for backend, values in logs.items()}
+
+    def select(self, problem, exclude=None):
+        """Name of the backend predicted to be fastest on `problem` (a path or WSPInstance)."""
+        costs = self.predicted_costs(instance_features(load_instance(problem)), exclude)
+        return _cheapest(costs)
+
+    def evaluate(self):
+        """Leave-one-out evaluation on the history: the median cost of the selected backends,
+        of every fixed backend and of the per-instance best (the oracle)."""
+        chosen, fixed, oracle = [], {}, []
+        for _, costs, path in self.rows:
+            backend = self.select(_instance_file(path), exclude=path)
+            chosen.append(costs.get(backend, max(costs.values())))
+            oracle.append(min(costs.values()))
+            for name, cost in costs.items():
+                fixed.setdefault(name, []).append(cost)
+        return {
+            'instances': len(self.rows),
+            'selected': statistics.median(chosen) if chosen else 0.0,
+            'oracle': statistics.median(oracle) if oracle else 0.0,
+            'fixed': {name: statistics.median(costs) for name, costs in sorted(fixed.items())},
+        }
+
+
+@lru_cache(maxsize=None)
+def default_selector():
+    """Selector trained on benchmarks/*.json, built once per process."""
+    return BackendSelector.from_files()
+
+
+def solve_single_solution(problem, time_limit=None, options=None, selector=None):
+    """Solve with the backend the selector picks for `problem`; the result records it in 'selected'."""
+    instance = load_instance(problem)
+    backend = (selector or default_selector()).select(instance)
+    d = backend_functions(backend)[0](instance, time_limit=time_limit, options=options)
+    d['selected'] = backend
+    return d
+
+
+def solve_multi_solution(problem, validator=None, max_solutions=10, time_limit=None, min_distance=1, options=None,
+                         selector=None):
+    """Multi-solution mode on the backend the selector picks for `problem`."""
+    instance = load_instance(problem)
+    backend = (selector or default_selector()).select(instance)
+    d = backend_functions(backend)[1](instance, validator, max_solutions=max_solutions, time_limit=time_limit,
+                                      min_distance=min_distance, options=options)
+    d['selected'] = backend
+    return d
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Predict the fastest WSP backend per instance.")
+    parser.add_argument("instances", nargs="*", help="instance files, directories or glob patterns")
+    parser.add_argument("--history", nargs="+", default=None,
+                        help="wsp_benchmark.py result files to learn from (default: benchmarks/*.json)")
+    parser.add_argument("-k", type=int, default=5, help="neighbours to consult")
+    parser.add_argument("--max-distance", type=float, default=MAX_NEIGHBOUR_DISTANCE,
+                        help=f"fall back to {DEFAULT_BACKEND} when the nearest recorded instance is further away")
+    parser.add_argument("--evaluate", action="store_true",
+                        help="leave-one-out median cost of the selector against every fixed backend")
+    args = parser.parse_args(argv)
+    configure_output(verbose=False, spinners=False)
+    selector = BackendSelector.from_files(args.history, args.k, args.max_distance)
+
+    for path in expand_instance_paths(args.instances):
+        features = instance_features(parse_instance(path))
+        costs = selector.predicted_costs(features)
+        backend = _cheapest(costs)
+        print(f"{path}: {backend}  "
+              + ("  ".join(f"{name} {cost * 1000:.1f}ms" for name, cost in sorted(costs.items()))
+                 or "(no similar instance in the history)"))
+
+    if args.evaluate:
+        result = selector.evaluate()
+        print(f"Leave-one-out over {result['instances']} instances, median cost: "
+              f"selected {result['selected'] * 1000:.1f}ms, oracle {result['oracle'] * 1000:.1f}ms, "
+              + ", ".join(f"{name} {cost * 1000:.1f}ms" for name, cost in result['fixed'].items()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())